@@ -12,6 +12,8 @@ load_dotenv()
 # Import all models to register them with SQLModel
 from app.models.user import User
 from app.models.task import Task
+from app.models.task_tag import TaskTag
+from app.models.outbox import OutboxEvent
 from app.models.event import Event
 from app.models.notification import Notification
 from app.models.recurrence_rule import RecurrenceRule
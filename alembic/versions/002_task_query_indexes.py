@@ -0,0 +1,52 @@
+"""Task query indexes for filtered/sorted task listing
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Composite indexes backing TaskService.get_by_user_advanced: the common
+    # "pending tasks for a user ordered by due date" listing and the
+    # per-user priority filter.
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_user_status_due ON task(user_id, completed, due_date DESC)")
+    except:
+        pass
+
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_user_priority ON task(user_id, priority)")
+    except:
+        pass
+
+    # GIN index for tag containment lookups (tags @> '{tag}'). Revision 001
+    # creates idx_tasks_tags with the same definition, so only add it when
+    # that one is missing.
+    try:
+        op.execute(
+            "DO $$ BEGIN "
+            "IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE tablename = 'task' AND indexname = 'idx_tasks_tags') THEN "
+            "CREATE INDEX IF NOT EXISTS ix_task_tags_gin ON task USING GIN (tags); "
+            "END IF; END $$"
+        )
+    except:
+        pass
+
+
+def downgrade():
+    try:
+        op.execute("DROP INDEX IF EXISTS ix_task_tags_gin")
+        op.execute("DROP INDEX IF EXISTS ix_task_user_priority")
+        op.execute("DROP INDEX IF EXISTS ix_task_user_status_due")
+    except:
+        pass
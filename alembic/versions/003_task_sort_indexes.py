@@ -0,0 +1,37 @@
+"""Task sort indexes for keyset pagination
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Default listing order and keyset cursor: (created_at, id) per user
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_user_created ON task(user_id, created_at DESC, id DESC)")
+    except:
+        pass
+
+    # sort_by=due_date
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_user_due ON task(user_id, due_date ASC NULLS LAST)")
+    except:
+        pass
+
+
+def downgrade():
+    try:
+        op.execute("DROP INDEX IF EXISTS ix_task_user_due")
+        op.execute("DROP INDEX IF EXISTS ix_task_user_created")
+    except:
+        pass
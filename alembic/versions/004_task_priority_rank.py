@@ -0,0 +1,42 @@
+"""Integer priority rank for index-backed priority sorting
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    try:
+        op.execute("ALTER TABLE task ADD COLUMN IF NOT EXISTS priority_rank INTEGER NOT NULL DEFAULT 2")
+    except:
+        op.add_column('task', sa.Column('priority_rank', sa.Integer(), server_default='2', nullable=False))
+
+    # Backfill from the existing priority strings
+    op.execute(
+        "UPDATE task SET priority_rank = CASE priority "
+        "WHEN 'high' THEN 1 WHEN 'medium' THEN 2 WHEN 'low' THEN 3 ELSE 4 END"
+    )
+
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_user_priority_rank ON task(user_id, priority_rank, created_at DESC)")
+    except:
+        pass
+
+
+def downgrade():
+    try:
+        op.execute("DROP INDEX IF EXISTS ix_task_user_priority_rank")
+        op.execute("ALTER TABLE task DROP COLUMN IF EXISTS priority_rank")
+    except:
+        op.drop_column('task', 'priority_rank')
@@ -0,0 +1,31 @@
+"""Index for upcoming-reminder range queries
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves ReminderScheduler's "completed = false AND due_date BETWEEN ..." scans
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_completed_due ON task(completed, due_date)")
+    except:
+        pass
+
+
+def downgrade():
+    try:
+        op.execute("DROP INDEX IF EXISTS ix_task_completed_due")
+    except:
+        pass
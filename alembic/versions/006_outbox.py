@@ -0,0 +1,36 @@
+"""Outbox table for events published after commit
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    try:
+        op.create_table(
+            'outbox',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('topic', sa.String(length=100), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+        )
+    except:
+        pass
+
+
+def downgrade():
+    try:
+        op.drop_table('outbox')
+    except:
+        pass
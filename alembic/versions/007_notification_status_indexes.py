@@ -0,0 +1,32 @@
+"""Partial indexes for pending/failed notification lookups
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_notification_pending ON notification(scheduled_time) WHERE status = 'pending'")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_notification_failed ON notification(scheduled_time) WHERE status = 'failed'")
+    except:
+        pass
+
+
+def downgrade():
+    try:
+        op.execute("DROP INDEX IF EXISTS ix_notification_pending")
+        op.execute("DROP INDEX IF EXISTS ix_notification_failed")
+    except:
+        pass
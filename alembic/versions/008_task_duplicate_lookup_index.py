@@ -0,0 +1,31 @@
+"""Index for recurring-task duplicate lookups
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves prevent_duplicate_creation's (user_id, title, due_date day range) probe
+    try:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_user_title_due ON task(user_id, title, due_date)")
+    except:
+        pass
+
+
+def downgrade():
+    try:
+        op.execute("DROP INDEX IF EXISTS ix_task_user_title_due")
+    except:
+        pass
@@ -0,0 +1,51 @@
+"""task_tag table and backfill from existing task tags
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # task_tag mirrors Task.tags on SQLite only (PostgreSQL filters the tags
+    # array through its GIN index), so there is nothing to do elsewhere.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    try:
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS task_tag ("
+            "task_id INTEGER NOT NULL REFERENCES task(id) ON DELETE CASCADE, "
+            "tag VARCHAR NOT NULL, "
+            "user_id VARCHAR NOT NULL, "
+            "PRIMARY KEY (task_id, tag))"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_task_tag_user_tag ON task_tag(user_id, tag)")
+    except:
+        pass
+
+    # Tasks written before task_tag existed (or by paths that didn't sync it)
+    # would otherwise be invisible to the tag filter
+    try:
+        op.execute(
+            "INSERT OR IGNORE INTO task_tag (task_id, tag, user_id) "
+            "SELECT task.id, tags.value, task.user_id "
+            "FROM task, json_each(CASE WHEN json_valid(task.tags) AND json_type(task.tags) = 'array' THEN task.tags ELSE '[]' END) AS tags "
+            "WHERE task.tags IS NOT NULL AND tags.type = 'text'"
+        )
+    except:
+        pass
+
+
+def downgrade():
+    # Leave task_tag in place: the application creates and maintains it
+    pass
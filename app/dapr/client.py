@@ -2,9 +2,11 @@
 import os
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import logging
 
+import httpx
+
 # Import dapr if available, otherwise provide fallback
 try:
     import dapr.clients
@@ -16,6 +18,11 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+DAPR_HTTP_PORT = os.environ.get("DAPR_HTTP_PORT", "3500")
+# Sidecar HTTP bulk publish endpoint; unlike the SDK's publish_events it
+# accepts caller-chosen entry ids, so failed entries map back to their items
+BULK_PUBLISH_URL = f"http://localhost:{DAPR_HTTP_PORT}/v1.0-alpha1/publish/bulk/task-pubsub"
+
 
 class DaprEventPublisher:
     """Publishes events to Kafka via Dapr pub/sub."""
@@ -23,9 +30,34 @@ class DaprEventPublisher:
     def __init__(self):
         """Initialize Dapr event publisher."""
         self.dapr_available = DAPR_AVAILABLE
+        self._client = None
+        self._http: Optional[httpx.Client] = None
         if not self.dapr_available:
             logger.warning("Dapr not available. Running in development mode without Dapr integration.")
 
+    @property
+    def client(self):
+        """Long-lived Dapr client, opened on first publish and reused afterwards."""
+        if self._client is None:
+            self._client = DaprClient()
+        return self._client
+
+    @property
+    def http(self) -> httpx.Client:
+        """Long-lived HTTP client for the sidecar's bulk publish endpoint."""
+        if self._http is None:
+            self._http = httpx.Client(timeout=5.0)
+        return self._http
+
+    def close(self):
+        """Close the shared Dapr and HTTP clients."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
     def publish_event(self, topic: str, event_type: str, data: Dict[str, Any], source: str = "todo-chat-api"):
         """Publish an event to a Kafka topic via Dapr pub/sub."""
         if not self.dapr_available:
@@ -45,13 +77,12 @@ class DaprEventPublisher:
 
             # Publish via Dapr
             import json
-            with DaprClient() as client:
-                client.publish_event(
-                    pubsub_name="task-pubsub",  # Defined in Dapr component
-                    topic_name=topic,
-                    data=json.dumps(event_envelope),  # Serialize the data to JSON string
-                    data_content_type="application/json"
-                )
+            self.client.publish_event(
+                pubsub_name="task-pubsub",  # Defined in Dapr component
+                topic_name=topic,
+                data=json.dumps(event_envelope),  # Serialize the data to JSON string
+                data_content_type="application/json"
+            )
 
             logger.info(f"Published event {event_type} to topic {topic}")
             return {"success": True, "event_id": event_envelope["event_id"]}
@@ -60,6 +91,84 @@ class DaprEventPublisher:
             logger.error(f"Failed to publish event to topic {topic}: {str(e)}")
             raise
 
+    def publish_events_bulk(self, topic: str, event_type: str, data_items: List[Dict[str, Any]],
+                            source: str = "todo-chat-api") -> List[bool]:
+        """
+        Publish many events to one topic in a single Dapr bulk publish call.
+
+        Entries the sidecar reports as failed (or every entry, if the bulk call
+        itself raises) are retried one by one through publish_event.
+
+        Returns:
+            One success flag per item, in input order
+        """
+        if not data_items:
+            return []
+
+        if not self.dapr_available:
+            for data in data_items:
+                self.publish_event(topic, event_type, data, source)
+            return [True] * len(data_items)
+
+        timestamp = datetime.utcnow().isoformat()
+        entries = [
+            {
+                "entryId": str(index),
+                "event": {
+                    "event_id": str(uuid.uuid4()),
+                    "type": event_type,
+                    "timestamp": timestamp,
+                    "source": source,
+                    "data": data
+                },
+                "contentType": "application/json"
+            }
+            for index, data in enumerate(data_items)
+        ]
+
+        try:
+            response = self.http.post(f"{BULK_PUBLISH_URL}/{topic}", json=entries)
+            retry = self._failed_entry_indexes(response, len(data_items))
+        except Exception as e:
+            logger.error(f"Bulk publish to topic {topic} failed, falling back to per-event publish: {str(e)}")
+            retry = list(range(len(data_items)))
+
+        results = [True] * len(data_items)
+        for index in retry:
+            try:
+                self.publish_event(topic, event_type, data_items[index], source)
+            except Exception:
+                results[index] = False
+
+        logger.info(f"Bulk published {results.count(True)}/{len(data_items)} {event_type} events to topic {topic}")
+        return results
+
+    @staticmethod
+    def _failed_entry_indexes(response: httpx.Response, count: int) -> List[int]:
+        """
+        Read the indexes of failed entries from a bulk publish response.
+
+        The sidecar answers 204 when every entry was published and 500 with a
+        failedEntries list otherwise; any other error fails the whole request.
+        """
+        if response.status_code != 500:
+            response.raise_for_status()
+            return []
+
+        failed_entries = response.json().get("failedEntries")
+        if not failed_entries:
+            response.raise_for_status()
+
+        retry = set()
+        for entry in failed_entries:
+            entry_id = entry.get("entryId", "")
+            if entry_id.isdigit() and int(entry_id) < count:
+                retry.add(int(entry_id))
+            else:
+                # Not one of ours, so we cannot tell which item it was
+                raise ValueError(f"Unknown bulk publish entry id {entry_id!r}")
+        return sorted(retry)
+
     def publish_task_created(self, task_data: Dict[str, Any]):
         """Publish task.created event."""
         return self.publish_event(
@@ -100,6 +209,14 @@ class DaprEventPublisher:
             data=reminder_data
         )
 
+    def publish_reminders_bulk(self, reminders: List[Dict[str, Any]]) -> List[bool]:
+        """Publish task.due_scheduled events for many reminders at once."""
+        return self.publish_events_bulk(
+            topic="reminders",
+            event_type="task.due_scheduled",
+            data_items=reminders
+        )
+
 
 # Global instance
 dapr_publisher = DaprEventPublisher()
\ No newline at end of file
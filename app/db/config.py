@@ -1,5 +1,6 @@
 """Database configuration for Phase II Todo Application."""
 from typing import Generator
+from functools import lru_cache
 from sqlmodel import create_engine, Session
 import os
 from dotenv import load_dotenv
@@ -19,6 +20,11 @@ if DATABASE_URL.startswith("postgresql"):
 else:
     print(f"[DB CONFIG] Using SQLite database: {DATABASE_URL}")
 
+# Compiled-SQL cache entries per engine. The advanced task listing builds a
+# different statement shape for each filter/sort combination, so the default
+# of 500 is raised to keep them all cached across requests.
+QUERY_CACHE_SIZE = int(os.environ.get("DB_QUERY_CACHE_SIZE", "1200"))
+
 # Create SQLModel engine
 # For SQLite, we need to disable pool_pre_ping which is PostgreSQL-specific
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
@@ -29,7 +35,7 @@ if DATABASE_URL.startswith("sqlite"):
     from sqlalchemy import text
     
     # Create engine first
-    engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
+    engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args, query_cache_size=QUERY_CACHE_SIZE)
     
     # Add event listener to handle array-like data for SQLite
     @event.listens_for(engine, "connect")
@@ -40,7 +46,24 @@ if DATABASE_URL.startswith("sqlite"):
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.close()
 else:
-    engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
+    engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args, query_cache_size=QUERY_CACHE_SIZE)
+
+
+@lru_cache(maxsize=4)
+def get_engine(database_url: str = DATABASE_URL) -> Engine:
+    """Return a shared, pooled engine for the given database URL.
+
+    Services that are handed a database URL use this instead of calling
+    create_engine themselves, so they share one connection pool per URL
+    (and the application engine when the URL matches DATABASE_URL).
+    """
+    if database_url == DATABASE_URL:
+        return engine
+    if database_url.startswith("sqlite"):
+        return create_engine(database_url, echo=False, connect_args={"check_same_thread": False},
+                             query_cache_size=QUERY_CACHE_SIZE)
+    return create_engine(database_url, echo=False, pool_size=10, max_overflow=20, pool_pre_ping=True,
+                         query_cache_size=QUERY_CACHE_SIZE)
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -2,6 +2,8 @@
 from sqlmodel import SQLModel
 from app.models.user import User
 from app.models.task import Task
+from app.models.task_tag import TaskTag
+from app.models.outbox import OutboxEvent
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.db.config import engine
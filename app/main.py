@@ -80,6 +80,13 @@ async def root():
     }
 
 
+@app.on_event("shutdown")
+def shutdown_event():
+    """Close the shared Dapr client."""
+    from app.dapr.client import dapr_publisher
+    dapr_publisher.close()
+
+
 # Import and include routers
 from app.routers import auth, tasks, chat
 app.include_router(auth.router, prefix="/auth")  # Auth endpoints: /auth/sign-up, /auth/sign-in
@@ -15,7 +15,7 @@ from sqlmodel import Session
 from datetime import datetime
 
 from app.mcp.base_tool import BaseMCPTool, MCPToolError, create_success_response, create_error_response
-from app.models.task import Task
+from app.models.task import Task, priority_rank
 from app.dapr.client import dapr_publisher
 
 
@@ -147,6 +147,7 @@ class AddTaskTool(BaseMCPTool):
                     description=description.strip() if description and isinstance(description, str) else description,
                     completed=False,
                     priority=priority,
+                    priority_rank=priority_rank(priority),
                     due_date=due_date,
                     tags=tags or [],
                     recurrence=recurrence,
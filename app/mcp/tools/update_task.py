@@ -15,7 +15,7 @@ from sqlmodel import Session, select
 from datetime import datetime
 
 from app.mcp.base_tool import BaseMCPTool, MCPToolError, create_success_response
-from app.models.task import Task
+from app.models.task import Task, priority_rank
 from app.dapr.client import dapr_publisher
 
 
@@ -153,6 +153,7 @@ class UpdateTaskTool(BaseMCPTool):
                     task.description = description
                 if priority is not None:
                     task.priority = priority
+                    task.priority_rank = priority_rank(priority)
                 if due_date is not None:
                     task.due_date = due_date
                 if tags is not None:
@@ -111,3 +111,28 @@ async def verify_user_access(
             detail="Not authorized to access this user's resources"
         )
     return user_id
+
+
+async def verify_user_match(
+    user_id: str,
+    current_user: CurrentUser = Depends(get_current_user)
+) -> CurrentUser:
+    """
+    Dependency ensuring the path user ID belongs to the authenticated user.
+
+    Args:
+        user_id: The user ID from the request path
+        current_user: Authenticated user resolved from the JWT
+
+    Returns:
+        The authenticated CurrentUser
+
+    Raises:
+        HTTPException: If user ID doesn't match the authenticated user
+    """
+    if user_id != current_user.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this user's resources"
+        )
+    return current_user
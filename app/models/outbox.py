@@ -0,0 +1,17 @@
+"""Outbox event model for SQLModel."""
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Text
+from datetime import datetime
+
+from app.models.task import utc_now
+
+
+class OutboxEvent(SQLModel, table=True):
+    """Event written in the same transaction as the rows it describes, published afterwards."""
+
+    __tablename__ = "outbox"
+
+    id: int | None = Field(default=None, primary_key=True)
+    topic: str = Field(max_length=100)
+    payload: str = Field(sa_column=Column(Text, nullable=False))  # JSON-encoded event envelope
+    created_at: datetime = Field(default_factory=utc_now)
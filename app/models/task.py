@@ -1,11 +1,13 @@
 """Task model for SQLModel."""
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, String, ForeignKey, Text
-from datetime import datetime
-from typing import TYPE_CHECKING, List, Optional
+from sqlalchemy import Column, String, ForeignKey, Text, delete, event, inspect, insert
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterable, List, Optional
 import os
 import json
 
+from app.models.task_tag import TaskTag
+
 if TYPE_CHECKING:
     from app.models.user import User
 
@@ -21,6 +23,19 @@ else:
     # Use Text column with JSON serialization for SQLite
     TAGS_COLUMN_TYPE = Column(Text)
 
+# Sortable integer form of Task.priority (high first); keep both columns in sync
+PRIORITY_RANKS = {"high": 1, "medium": 2, "low": 3}
+
+
+def priority_rank(priority: Optional[str]) -> int:
+    """Return the priority_rank value stored alongside a priority string."""
+    return PRIORITY_RANKS.get(priority, 4)
+
+
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, matching the naive DateTime columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class Task(SQLModel, table=True):
     """Task entity representing a todo item with advanced features."""
@@ -32,11 +47,12 @@ class Task(SQLModel, table=True):
     title: str = Field(max_length=200, min_length=1)
     description: str | None = Field(default=None, max_length=1000)
     completed: bool = Field(default=False)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
 
     # Phase V: Advanced task features
     priority: str = Field(default="medium", max_length=20)  # high, medium, low
+    priority_rank: int = Field(default=2)  # 1=high, 2=medium, 3=low; indexed sort key
     due_date: Optional[datetime] = Field(default=None)  # timezone-aware datetime
     tags: Optional[List[str]] = Field(sa_column=TAGS_COLUMN_TYPE)  # array of tags (PostgreSQL) or JSON (SQLite)
     recurrence: Optional[str] = Field(default=None, max_length=50)  # daily, weekly, monthly, custom
@@ -89,4 +105,47 @@ class Task(SQLModel, table=True):
         """Pydantic configuration for proper serialization."""
         json_encoders = {
             datetime: lambda v: v.isoformat()
-        }
\ No newline at end of file
+        }
+
+
+def sync_task_tags(connection, tasks: Iterable[Task]) -> None:
+    """
+    Mirror tasks' tags into task_tag (SQLite only) so tag filters can use an index.
+
+    ORM inserts and updates are kept in sync by the mapper events below;
+    callers writing tasks with Core INSERTs call this once the ids are known.
+
+    Args:
+        connection: Session or Connection inside the writing transaction
+        tasks: Tasks with their ids assigned
+    """
+    if not IS_SQLITE:
+        return
+
+    tasks = [task for task in tasks if task.id is not None]
+    if not tasks:
+        return
+
+    task_tag = TaskTag.__table__
+    connection.execute(delete(task_tag).where(task_tag.c.task_id.in_([task.id for task in tasks])))
+    rows = [
+        {"task_id": task.id, "user_id": task.user_id, "tag": tag}
+        for task in tasks
+        for tag in dict.fromkeys(task.tags_serialized)
+    ]
+    if rows:
+        connection.execute(insert(task_tag), rows)
+
+
+@event.listens_for(Task, "after_insert")
+def _sync_tags_after_insert(mapper, connection, target: Task):
+    """Write task_tag rows for a task inserted through the ORM."""
+    if IS_SQLITE and target.tags:
+        sync_task_tags(connection, [target])
+
+
+@event.listens_for(Task, "after_update")
+def _sync_tags_after_update(mapper, connection, target: Task):
+    """Rewrite task_tag rows when an ORM flush changed a task's tags."""
+    if IS_SQLITE and inspect(target).attrs.tags.history.has_changes():
+        sync_task_tags(connection, [target])
@@ -0,0 +1,14 @@
+"""Task tag model for SQLModel."""
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+
+
+class TaskTag(SQLModel, table=True):
+    """Normalized (task, tag) pair backing indexed tag lookups on SQLite."""
+
+    __tablename__ = "task_tag"
+    __table_args__ = (Index("ix_task_tag_user_tag", "user_id", "tag"),)
+
+    task_id: int = Field(sa_column=Column(Integer, ForeignKey("task.id", ondelete="CASCADE"), primary_key=True))
+    tag: str = Field(sa_column=Column(String, primary_key=True))
+    user_id: str = Field(sa_column=Column(String, nullable=False))
@@ -1,77 +1,137 @@
 """Task router for Phase V Advanced Task Management."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import TypeAdapter
+from typing import List, Optional
 from datetime import datetime
+import logging
 
-from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
+from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskListResponse
 from app.services.task_service import TaskService
-from app.middleware.auth import get_current_user, CurrentUser
-from app.db.config import get_session
+from app.middleware.auth import verify_user_match, CurrentUser
+from app.db.config import engine, get_session
 from sqlmodel import Session
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["Tasks"])  # No prefix since main.py adds /api prefix
 
+_PRIORITIES = frozenset(("high", "medium", "low"))
+
+# Sort orders other than the default created_at; the keyset cursor doesn't apply to them
+_NON_CURSOR_SORTS = frozenset(("due_date", "priority", "title"))
+
+_TASK_LIST_ADAPTER = TypeAdapter(List[TaskResponse])
+
+
+def _task_list_response(tasks) -> Response:
+    """Validate and serialize a list of tasks in a single pydantic-core pass."""
+    validated = _TASK_LIST_ADAPTER.validate_python(tasks, from_attributes=True)
+    return Response(content=_TASK_LIST_ADAPTER.dump_json(validated), media_type="application/json")
+
+
+def get_task_service(
+    current_user: CurrentUser = Depends(verify_user_match),
+    session: Session = Depends(get_session),
+) -> TaskService:
+    """Dependency for getting TaskService instance.
 
-def get_task_service(session: Session = Depends(get_session)) -> TaskService:
-    """Dependency for getting TaskService instance."""
+    The ownership check is resolved before the session, so forbidden requests
+    never open a database session.
+    """
     return TaskService(session)
 
 
-@router.get("/{user_id}/tasks", response_model=Dict[str, Any])
+@router.get("/{user_id}/tasks", response_model=TaskListResponse)
 async def list_tasks(
     user_id: str,
-    current_user: CurrentUser = Depends(get_current_user),
-    service: TaskService = Depends(get_task_service),
+    current_user: CurrentUser = Depends(verify_user_match),
     filter_type: str = Query("all", description="Filter by status: all, pending, completed"),
     priority: Optional[str] = Query(None, description="Filter by priority: high, medium, low"),
     tag: Optional[str] = Query(None, description="Filter by specific tag"),
-    due_from: Optional[str] = Query(None, description="Filter tasks with due date >= this date (ISO format)"),
-    due_to: Optional[str] = Query(None, description="Filter tasks with due date <= this date (ISO format)"),
+    due_from: Optional[datetime] = Query(None, description="Filter tasks with due date >= this date (ISO format)"),
+    due_to: Optional[datetime] = Query(None, description="Filter tasks with due date <= this date (ISO format)"),
     sort_by: str = Query("created_at", description="Sort by field: created_at, due_date, priority, title"),
     search: Optional[str] = Query(None, description="Search keyword for title/description"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Maximum number of tasks to return"),
+    after_created_at: Optional[datetime] = Query(None, description="Keyset cursor: created_at of the last task of the previous page"),
+    after_id: Optional[int] = Query(None, description="Keyset cursor: id of the last task of the previous page"),
 ):
-    """List tasks for the authenticated user with advanced filtering and sorting."""
+    """List tasks for the authenticated user with advanced filtering and sorting.
 
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
+    The body is streamed row by row so memory stays flat for users with many tasks.
+    The stream owns its own session rather than using the get_session dependency,
+    whose teardown may run before the body is sent (FastAPI 0.106-0.117).
+    """
+    if (after_created_at is None) != (after_id is None):
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this user's resources"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_created_at and after_id must be given together"
+        )
+    after = (after_created_at, after_id) if after_created_at is not None else None
+    if after is not None and sort_by in _NON_CURSOR_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Keyset cursor is only supported with sort_by=created_at"
         )
 
-    tasks = service.get_by_user_advanced(
-        user_id=user_id,
-        filter_type=filter_type,
-        priority=priority,
-        tag=tag,
-        due_from=due_from,
-        due_to=due_to,
-        sort_by=sort_by,
-        search=search
-    )
-
-    return {
-        "tasks": tasks,
-        "count": len(tasks)
-    }
+    session = Session(engine)
+    try:
+        tasks = TaskService(session).iter_by_user_advanced(
+            user_id=user_id,
+            filter_type=filter_type,
+            priority=priority,
+            tag=tag,
+            due_from=due_from,
+            due_to=due_to,
+            sort_by=sort_by,
+            search=search,
+            limit=limit,
+            after=after
+        )
+        # Run the query and fetch the first row before committing to a 200,
+        # so query errors still produce an error response
+        first = await run_in_threadpool(next, tasks, None)
+    except Exception:
+        session.close()
+        raise
+
+    def generate():
+        try:
+            yield b'{"tasks":['
+            count = 0
+            task = first
+            while task is not None:
+                if count:
+                    yield b','
+                yield TaskResponse.model_validate(task).model_dump_json().encode()
+                count += 1
+                task = next(tasks, None)
+            yield b'],"count":' + str(count).encode() + b'}'
+        except Exception as e:
+            # Headers are already sent; re-raising makes the server abort the
+            # chunked response instead of ending it as if the JSON were complete
+            logger.error(f"Error streaming tasks for user {user_id}: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+    # The background task also closes the session if the body is never iterated
+    return StreamingResponse(generate(), media_type="application/json", background=BackgroundTask(session.close))
 
 
 @router.post("/{user_id}/tasks", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 async def create_task(
     user_id: str,
     task_data: TaskCreate,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Create a new task with advanced features (priority, due date, tags, recurrence)."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to create tasks for this user"
-        )
-
-    return service.create_advanced(
+    return await run_in_threadpool(
+        service.create_advanced,
         user_id=user_id,
         title=task_data.title,
         description=task_data.description,
@@ -87,18 +147,11 @@ async def create_task(
 async def get_task(
     user_id: str,
     task_id: int,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Get a specific task by ID."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this user's resources"
-        )
-
-    task = service.get_by_id(task_id, user_id)
+    task = await run_in_threadpool(service.get_by_id, task_id, user_id)
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -112,18 +165,12 @@ async def update_task(
     user_id: str,
     task_id: int,
     task_data: TaskUpdate,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Update a task with advanced features (title, description, priority, due date, tags, recurrence)."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update tasks for this user"
-        )
-
-    task = service.update_advanced(
+    task = await run_in_threadpool(
+        service.update_advanced,
         task_id=task_id,
         user_id=user_id,
         title=getattr(task_data, 'title', None),
@@ -146,18 +193,11 @@ async def update_task(
 async def delete_task(
     user_id: str,
     task_id: int,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Delete a task."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete tasks for this user"
-        )
-
-    success = service.delete(task_id, user_id)
+    success = await run_in_threadpool(service.delete, task_id, user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -169,18 +209,11 @@ async def delete_task(
 async def toggle_complete(
     user_id: str,
     task_id: int,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Toggle task completion status."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to complete tasks for this user"
-        )
-
-    task = service.toggle_complete(task_id, user_id)
+    task = await run_in_threadpool(service.toggle_complete, task_id, user_id)
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -193,84 +226,51 @@ async def toggle_complete(
 async def get_tasks_by_priority(
     user_id: str,
     priority_level: str,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Get tasks filtered by priority level."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this user's resources"
-        )
-
-    if priority_level not in ["high", "medium", "low"]:
+    if priority_level not in _PRIORITIES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Priority must be one of: high, medium, low"
         )
 
-    return service.get_by_priority(user_id, priority_level)
+    tasks = await run_in_threadpool(service.get_by_priority, user_id, priority_level)
+    return _task_list_response(tasks)
 
 
 @router.get("/{user_id}/tasks/tag/{tag_name}", response_model=List[TaskResponse])
 async def get_tasks_by_tag(
     user_id: str,
     tag_name: str,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Get tasks filtered by tag."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this user's resources"
-        )
-
-    return service.get_by_tag(user_id, tag_name)
+    tasks = await run_in_threadpool(service.get_by_tag, user_id, tag_name)
+    return _task_list_response(tasks)
 
 
 @router.get("/{user_id}/recurring-tasks", response_model=List[TaskResponse])
 async def get_recurring_tasks(
     user_id: str,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
 ):
     """Get all recurring tasks for the user."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this user's resources"
-        )
-
-    return service.get_recurring_tasks(user_id)
+    tasks = await run_in_threadpool(service.get_recurring_tasks, user_id)
+    return _task_list_response(tasks)
 
 
 @router.get("/{user_id}/tasks/due-range", response_model=List[TaskResponse])
 async def get_tasks_by_due_range(
     user_id: str,
-    current_user: CurrentUser = Depends(get_current_user),
+    current_user: CurrentUser = Depends(verify_user_match),
     service: TaskService = Depends(get_task_service),
-    due_from: str = Query(..., description="Start date in ISO format (e.g., 2026-02-01)"),
-    due_to: str = Query(..., description="End date in ISO format (e.g., 2026-02-28)")
+    due_from: datetime = Query(..., description="Start date in ISO format (e.g., 2026-02-01)"),
+    due_to: datetime = Query(..., description="End date in ISO format (e.g., 2026-02-28)")
 ):
     """Get tasks with due dates in a specific range."""
-    # Verify that the user_id in the path matches the authenticated user
-    if user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this user's resources"
-        )
-
-    try:
-        start_date = datetime.fromisoformat(due_from)
-        end_date = datetime.fromisoformat(due_to)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid date format. Use ISO format (YYYY-MM-DD)"
-        )
-
-    return service.get_tasks_by_due_range(user_id, start_date, end_date)
+    tasks = await run_in_threadpool(service.get_tasks_by_due_range, user_id, due_from, due_to)
+    return _task_list_response(tasks)
@@ -1,7 +1,8 @@
 """Task schemas for Phase V Advanced Task Management."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from typing import Optional, List
+import json
 
 
 class TaskCreate(BaseModel):
@@ -45,6 +46,25 @@ class TaskResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @field_validator("tags", mode="before")
+    @classmethod
+    def deserialize_tags(cls, value):
+        """Decode tags stored as a JSON string (SQLite) into a list."""
+        if value is None:
+            return []
+        if isinstance(value, str):
+            try:
+                return json.loads(value) if value else []
+            except (json.JSONDecodeError, TypeError):
+                return []
+        return value
+
+
+class TaskListResponse(BaseModel):
+    """Schema for the task list API response."""
+    tasks: List[TaskResponse]
+    count: int
+
 
 class TaskToggleComplete(BaseModel):
     """Schema for toggling task completion (empty body, just an action)."""
@@ -5,10 +5,12 @@ Consumes reminder events from Kafka and sends notifications to users.
 """
 
 import asyncio
+import json
 import logging
+import os
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import pytz
+from typing import Dict, Any, List, Optional, Tuple
 
 # Import dapr if available, otherwise provide fallback
 try:
@@ -19,22 +21,67 @@ except ImportError:
     DAPR_AVAILABLE = False
     DaprClient = None
 
-from sqlmodel import create_engine, Session, select
+# Import confluent-kafka if available for direct topic consumption
+try:
+    from confluent_kafka import Consumer as KafkaConsumer, TopicPartition
+    KAFKA_AVAILABLE = True
+except ImportError:
+    KAFKA_AVAILABLE = False
+    KafkaConsumer = TopicPartition = None
+
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, select
+from app.db.config import get_engine
 from app.models.task import Task
 
 logger = logging.getLogger(__name__)
 
+# Reminder events are buffered up to this many (or for this long) before
+# their tasks are looked up in a single query
+REMINDER_BATCH_SIZE = 100
+REMINDER_BATCH_WAIT_SECONDS = 0.05
+
+# Direct Kafka consumption (used instead of the Dapr stub when configured)
+KAFKA_BROKERS = os.environ.get("KAFKA_BROKERS")
+KAFKA_REMINDER_TOPIC = os.environ.get("KAFKA_REMINDER_TOPIC", "reminders")
+KAFKA_GROUP_ID = os.environ.get("KAFKA_GROUP_ID", "notification-service")
+# Roughly 1.5-2x librdkafka's default fetch.wait.max.ms (500ms)
+KAFKA_POLL_TIMEOUT_SECONDS = 0.75
+# A partly filled batch is flushed at the latest this long after its first message
+KAFKA_BATCH_MAX_WAIT_SECONDS = 1.0
+# Backoff before re-reading a batch that failed to process
+KAFKA_RETRY_BASE_SECONDS = 1.0
+KAFKA_RETRY_CAP_SECONDS = 30.0
+
+# How often the Dapr consumer loop wakes while waiting for events
+CONSUMER_IDLE_SECONDS = 1.0
+
 class NotificationService:
     """Service to handle task reminder notifications."""
 
     def __init__(self, database_url: str):
         """Initialize the notification service."""
-        self.engine = create_engine(database_url)
+        self.engine = get_engine(database_url)
+        self.SessionLocal = sessionmaker(bind=self.engine, class_=Session, expire_on_commit=False)
         self.dapr_available = DAPR_AVAILABLE
+        # One long-lived sidecar client, reused for every publish
+        self._dapr = DaprClient() if self.dapr_available else None
 
         if not self.dapr_available:
             logger.warning("Dapr not available. Running in development mode without Dapr integration.")
 
+    def close(self):
+        """Close the shared Dapr client."""
+        if self._dapr is not None:
+            self._dapr.close()
+            self._dapr = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
     def send_notification(self, user_id: str, task_id: int, title: str, due_date: str, message: str):
         """Send a notification to the user."""
         # In a real implementation, this would send an actual notification
@@ -43,67 +90,225 @@ class NotificationService:
         logger.info(f"NOTIFICATION for user {user_id}: Task {task_id} '{title}' is due at {due_date}")
         logger.info(f"Message: {message}")
 
-    def process_reminder_event(self, event_data: Dict[str, Any]) -> bool:
-        """Process a reminder event and send notification."""
-        try:
-            task_id = event_data.get("task_id")
-            user_id = event_data.get("user_id")
-            due_date = event_data.get("due_date")
-            title = event_data.get("title")
+    def _fetch_task_states(self, pairs: List[Tuple[int, str]]) -> Dict[Tuple[int, str], bool]:
+        """Look up the completion state of several tasks in one query, keyed by (task_id, user_id)."""
+        if not pairs:
+            return {}
+
+        wanted = set(pairs)
+        with self.SessionLocal() as session:
+            statement = select(Task.id, Task.user_id, Task.completed).where(
+                Task.id.in_({task_id for task_id, _ in wanted})
+            )
+            rows = session.exec(statement).all()
+
+        return {
+            (task_id, user_id): completed
+            for task_id, user_id, completed in rows
+            if (task_id, user_id) in wanted
+        }
+
+    def _dispatch_reminder(self, event_data: Dict[str, Any], task_states: Dict[Tuple[int, str], bool]) -> bool:
+        """Send the notification for a single reminder event using prefetched task state."""
+        task_id = event_data.get("task_id")
+        user_id = event_data.get("user_id")
+        due_date = event_data.get("due_date")
+        title = event_data.get("title")
+
+        completed = task_states.get((task_id, user_id))
+        if completed is None:
+            logger.error(f"Task {task_id} not found for user {user_id}")
+            return False
+
+        # Check if task is not already completed
+        if completed:
+            logger.info(f"Task {task_id} is already completed, skipping notification")
+            return True
+
+        # Send notification
+        message = f"Reminder: Task '{title}' is due soon!"
+        if due_date:
+            message = f"Reminder: Task '{title}' is due at {due_date}"
+
+        self.send_notification(user_id, task_id, title, due_date, message)
+
+        # In production, publish an event for the notification sent
+        if self._dapr is not None:
+            try:
+                notification_event = {
+                    "task_id": task_id,
+                    "user_id": user_id,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "status": "sent"
+                }
+
+                self._dapr.publish_event(
+                    pubsub_name="task-pubsub",
+                    topic_name="notifications",
+                    data={"event_id": f"notification_{task_id}", "type": "notification.sent", "data": notification_event},
+                    data_content_type="application/json"
+                )
+            except Exception as e:
+                logger.error(f"Failed to publish notification.sent event: {str(e)}")
 
-            if not all([task_id, user_id, title]):
+        return True
+
+    def process_reminder_batch(self, events: List[Dict[str, Any]], raise_on_error: bool = False) -> List[bool]:
+        """
+        Process several reminder events, verifying all their tasks with a single query.
+
+        Args:
+            events: Reminder event payloads
+            raise_on_error: Re-raise database/dispatch errors instead of
+                reporting the affected events as failed; invalid events and
+                unknown tasks are still reported as False
+
+        Returns:
+            One success flag per event, in input order
+        """
+        results = [False] * len(events)
+        valid = []
+
+        for index, event_data in enumerate(events):
+            if not all([event_data.get("task_id"), event_data.get("user_id"), event_data.get("title")]):
                 logger.error("Missing required fields in reminder event data")
-                return False
+                continue
+            valid.append(index)
+
+        try:
+            task_states = self._fetch_task_states(
+                [(events[i]["task_id"], events[i]["user_id"]) for i in valid]
+            )
+        except Exception as e:
+            logger.error(f"Error processing reminder batch: {str(e)}")
+            if raise_on_error:
+                raise
+            return results
 
-            # Verify task exists
-            with Session(self.engine) as session:
-                statement = select(Task).where(Task.id == task_id, Task.user_id == user_id)
-                task = session.exec(statement).first()
+        for index in valid:
+            try:
+                results[index] = self._dispatch_reminder(events[index], task_states)
+            except Exception as e:
+                logger.error(f"Error processing reminder event: {str(e)}")
+                if raise_on_error:
+                    raise
 
-                if not task:
-                    logger.error(f"Task {task_id} not found for user {user_id}")
-                    return False
+        return results
 
-                # Check if task is not already completed
-                if task.completed:
-                    logger.info(f"Task {task_id} is already completed, skipping notification")
-                    return True
+    def process_reminder_event(self, event_data: Dict[str, Any]) -> bool:
+        """Process a reminder event and send notification."""
+        return self.process_reminder_batch([event_data])[0]
 
-            # Send notification
-            message = f"Reminder: Task '{title}' is due soon!"
-            if due_date:
-                message = f"Reminder: Task '{title}' is due at {due_date}"
+    async def consume_reminder_queue(self, queue: "asyncio.Queue[Dict[str, Any]]"):
+        """Drain reminder events from a queue in small time-bounded batches."""
+        loop = asyncio.get_running_loop()
 
-            self.send_notification(user_id, task_id, title, due_date, message)
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + REMINDER_BATCH_WAIT_SECONDS
 
-            # In production, publish an event for the notification sent
-            if self.dapr_available:
+            while len(batch) < REMINDER_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
                 try:
-                    with DaprClient() as client:
-                        notification_event = {
-                            "task_id": task_id,
-                            "user_id": user_id,
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "status": "sent"
-                        }
-
-                        client.publish_event(
-                            pubsub_name="task-pubsub",
-                            topic_name="notifications",
-                            data={"event_id": f"notification_{task_id}", "type": "notification.sent", "data": notification_event},
-                            data_content_type="application/json"
-                        )
-                except Exception as e:
-                    logger.error(f"Failed to publish notification.sent event: {str(e)}")
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
 
-            return True
+            # Run the blocking DB/Dapr work off the event loop
+            await asyncio.to_thread(self.process_reminder_batch, batch)
 
-        except Exception as e:
-            logger.error(f"Error processing reminder event: {str(e)}")
-            return False
+    def consume_kafka_reminders(self):
+        """
+        Consume reminder events straight from Kafka on the calling thread.
+
+        librdkafka auto-commits stored offsets in the background; offsets are
+        only stored once the batch their messages belong to has been processed,
+        so a crash mid-batch redelivers it instead of dropping it. If the batch
+        fails (e.g. the database is down), each partition is rewound to the
+        batch's first message and the batch is read again after a backoff, so
+        delivery is at-least-once.
+        """
+        consumer = KafkaConsumer({
+            "bootstrap.servers": KAFKA_BROKERS,
+            "group.id": KAFKA_GROUP_ID,
+            "enable.auto.commit": True,
+            "enable.auto.offset.store": False,
+        })
+        consumer.subscribe([KAFKA_REMINDER_TOPIC])
+
+        # Every polled message is kept for its offset, including skipped ones,
+        # so nothing is committed past a message that hasn't been processed
+        messages = []
+        events = []
+        batch_started = 0.0
+        failures = 0
+        try:
+            while True:
+                msg = consumer.poll(KAFKA_POLL_TIMEOUT_SECONDS)
+
+                if msg is not None:
+                    if msg.error():
+                        logger.error(f"Kafka consumer error: {msg.error()}")
+                        continue
+                    if not messages:
+                        batch_started = time.monotonic()
+                    messages.append(msg)
+
+                    try:
+                        envelope = json.loads(msg.value())
+                    except (TypeError, ValueError):
+                        envelope = None
+                    event_data = envelope.get("data", envelope) if isinstance(envelope, dict) else None
+                    if isinstance(event_data, dict):
+                        events.append(event_data)
+                    else:
+                        logger.error(f"Skipping malformed reminder message at offset {msg.offset()}")
+
+                # Flush when the buffer is full, the topic has gone quiet, or
+                # the oldest buffered message has waited long enough
+                if messages and (
+                    msg is None
+                    or len(events) >= REMINDER_BATCH_SIZE
+                    or time.monotonic() - batch_started >= KAFKA_BATCH_MAX_WAIT_SECONDS
+                ):
+                    try:
+                        if events:
+                            self.process_reminder_batch(events, raise_on_error=True)
+                    except Exception as e:
+                        failures += 1
+                        delay = min(KAFKA_RETRY_CAP_SECONDS, KAFKA_RETRY_BASE_SECONDS * 2 ** min(failures, 10))
+                        logger.error(f"Reminder batch failed: {str(e)}; re-reading it in {delay:.1f}s")
+                        self._rewind(consumer, messages)
+                        time.sleep(delay)
+                    else:
+                        failures = 0
+                        for message in messages:
+                            consumer.store_offsets(message=message)
+                    messages = []
+                    events = []
+        finally:
+            consumer.close()
+
+    @staticmethod
+    def _rewind(consumer, messages):
+        """Seek each partition back to its first message in `messages` so they are redelivered."""
+        first_offsets = {}
+        for message in messages:
+            key = (message.topic(), message.partition())
+            if key not in first_offsets or message.offset() < first_offsets[key]:
+                first_offsets[key] = message.offset()
+        for (topic, partition), offset in first_offsets.items():
+            consumer.seek(TopicPartition(topic, partition, offset))
 
     async def start_consumer(self):
         """Start consuming reminder events from Kafka via Dapr."""
+        if KAFKA_AVAILABLE and KAFKA_BROKERS:
+            logger.info(f"Consuming '{KAFKA_REMINDER_TOPIC}' directly from Kafka at {KAFKA_BROKERS}")
+            await asyncio.to_thread(self.consume_kafka_reminders)
+            return
+
         if not self.dapr_available:
             logger.info("Dapr not available - running in development mode without Kafka consumption")
             return
@@ -112,13 +317,12 @@ class NotificationService:
 
         while True:
             try:
-                # In a real implementation, this would connect to Kafka via Dapr
-                # For now, we'll simulate event consumption
-                with DaprClient() as client:
-                    # Subscribe to reminders topic and listen for reminder events
-                    # This is a simplified version - in reality you'd need to implement
-                    # proper event subscription and processing
-                    pass
+                # In a real implementation, this would subscribe to the reminders
+                # topic through the shared Dapr client and process reminder events.
+                # This is a simplified version - in reality you'd need to implement
+                # proper event subscription and processing; until then, yield to
+                # the event loop instead of spinning
+                await asyncio.sleep(CONSUMER_IDLE_SECONDS)
 
             except Exception as e:
                 logger.error(f"Error in notification consumer: {str(e)}")
@@ -3,6 +3,23 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 import re
 
+_PRIORITIES = frozenset(("high", "medium", "low"))
+_RECURRENCES = frozenset(("daily", "weekly", "monthly", "custom"))
+
+# Tag character whitelist: the regex handles arbitrary unicode, ASCII tags are
+# checked with bytes.translate (deleting every allowed byte must leave nothing)
+_TAG_PATTERN = re.compile(r'^[\w\s\-_.]+$')
+_TAG_ASCII_ALLOWED = bytes(
+    c for c in range(128) if chr(c).isalnum() or chr(c).isspace() or chr(c) in "_-."
+)
+
+
+def _is_valid_tag_chars(tag: str) -> bool:
+    """Return True if the tag only contains word, whitespace, '-', '_' or '.' characters."""
+    if tag.isascii():
+        return bool(tag) and not tag.encode("ascii").translate(None, _TAG_ASCII_ALLOWED)
+    return _TAG_PATTERN.match(tag) is not None
+
 
 class RecurrenceValidator:
     """Validate recurrence rules for tasks."""
@@ -26,7 +43,7 @@ class RecurrenceValidator:
         }
 
         # Validate recurrence type
-        if recurrence not in ["daily", "weekly", "monthly", "custom"]:
+        if recurrence not in _RECURRENCES:
             result["valid"] = False
             result["errors"].append("Recurrence must be one of: daily, weekly, monthly, custom")
             return result
@@ -157,7 +174,7 @@ class RecurrenceValidator:
                 return result
 
             # Check for invalid characters in tag
-            if not re.match(r'^[\w\s\-_.]+$', tag):
+            if not _is_valid_tag_chars(tag):
                 result["warnings"].append(f"Tag '{tag}' contains potentially problematic characters")
 
         return result
@@ -182,7 +199,7 @@ class RecurrenceValidator:
         if not priority:
             return result
 
-        if priority not in ["high", "medium", "low"]:
+        if priority not in _PRIORITIES:
             result["valid"] = False
             result["errors"].append(f"Priority must be one of: high, medium, low, got: {priority}")
 
@@ -5,10 +5,15 @@ Consumes task.completed events from Kafka and creates next occurrence based on r
 """
 
 import asyncio
+import calendar
+import json
 import logging
+import os
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import pytz
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from dateutil.rrule import rrule, rrulestr
 
 # Import dapr if available, otherwise provide fallback
 try:
@@ -19,87 +24,153 @@ except ImportError:
     DAPR_AVAILABLE = False
     DaprClient = None
 
-from sqlmodel import create_engine, Session, select
-from app.models.task import Task
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+from app.db.config import get_engine
+from app.models.task import IS_SQLITE, Task, sync_task_tags, utc_now
+from app.models.outbox import OutboxEvent
 
 logger = logging.getLogger(__name__)
 
+# task.completed events are processed in batches flushed on size or timeout
+BATCH_SIZE = int(os.environ.get("RECURRING_BATCH_SIZE", "500"))
+BATCH_TIMEOUT_MS = int(os.environ.get("RECURRING_BATCH_TIMEOUT_MS", "100"))
+
+# task.created events go through the outbox table; at most this many publishes
+# are in flight at once, and undelivered rows are retried on this interval
+PUBLISH_MAX_IN_FLIGHT = int(os.environ.get("RECURRING_PUBLISH_MAX_IN_FLIGHT", "64"))
+OUTBOX_RETRY_SECONDS = 5
+OUTBOX_DRAIN_LIMIT = 500
+
+
+# Days to the next weekday, indexed by datetime.weekday() (Monday=0)
+_WEEKDAY_STEP = (1, 1, 1, 1, 3, 2, 1)
+
+
+@lru_cache(maxsize=2048)
+def _month_max_day(year: int, month: int) -> int:
+    """Number of days in the given month."""
+    return calendar.monthrange(year, month)[1]
+
+
+@lru_cache(maxsize=4096)
+def _parsed_rule(rule: str):
+    """Parse an iCalendar RRULE string once and reuse the result."""
+    return rrulestr(rule)
+
+
+def _next_monthly(last_completion: datetime, recurrence_rule: Optional[str]) -> datetime:
+    """Same day next month, clamped to the length of that month."""
+    next_month = last_completion.month + 1
+    next_year = last_completion.year
+    if next_month > 12:
+        next_month = 1
+        next_year += 1
+
+    # Handle months with different number of days
+    max_day = _month_max_day(next_year, next_month)
+    next_day = min(last_completion.day, max_day)
+
+    return last_completion.replace(year=next_year, month=next_month, day=next_day)
+
+
+def _next_custom(last_completion: datetime, recurrence_rule: Optional[str]) -> Optional[datetime]:
+    """Simple custom patterns, falling back to iCalendar RRULE strings."""
+    if not recurrence_rule:
+        return None
+
+    if "every_2_days" in recurrence_rule:
+        return last_completion + timedelta(days=2)
+    if "every_weekday" in recurrence_rule:
+        # Next weekday: Friday jumps 3 days, Saturday 2, everything else 1
+        return last_completion + timedelta(days=_WEEKDAY_STEP[last_completion.weekday()])
+
+    try:
+        rule = _parsed_rule(recurrence_rule)
+        if isinstance(rule, rrule):
+            # Anchor the cached rule at the completion time
+            rule = rule.replace(dtstart=last_completion)
+        return rule.after(last_completion, inc=False)
+    except (ValueError, TypeError):
+        logger.warning(f"Unsupported custom recurrence rule: {recurrence_rule}")
+        return None
+
+
+_RECURRENCE_HANDLERS = {
+    "daily": lambda last_completion, _: last_completion + timedelta(days=1),
+    "weekly": lambda last_completion, _: last_completion + timedelta(weeks=1),
+    "monthly": _next_monthly,
+    "custom": _next_custom,
+}
+
+
 class RecurringTaskService:
     """Service to handle recurring task logic."""
 
     def __init__(self, database_url: str):
         """Initialize the recurring task service."""
-        self.engine = create_engine(database_url)
+        self.engine = get_engine(database_url)
         self.dapr_available = DAPR_AVAILABLE
+        self._pending: Optional["asyncio.Queue[Tuple[Dict[str, Any], asyncio.Future]]"] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._outbox_ready: Optional[asyncio.Event] = None
+        # Held by whichever drain (inline flush or background publisher) is
+        # publishing, so the same outbox row is never sent twice
+        self._outbox_lock = threading.Lock()
+        # One long-lived sidecar client, reused for every publish
+        self._dapr = DaprClient() if self.dapr_available else None
 
         if not self.dapr_available:
             logger.warning("Dapr not available. Running in development mode without Dapr integration.")
 
+    def close(self):
+        """Close the shared Dapr client."""
+        if self._dapr is not None:
+            self._dapr.close()
+            self._dapr = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
     def calculate_next_occurrence(self, recurrence: str, recurrence_rule: str, last_completion: datetime) -> Optional[datetime]:
         """Calculate the next occurrence based on recurrence rules."""
-        if not recurrence:
-            return None
+        handler = _RECURRENCE_HANDLERS.get(recurrence)
+        return handler(last_completion, recurrence_rule) if handler else None
 
-        # For simplicity, implement basic recurrence patterns
-        # In production, use a library like dateutil.rrule for complex rules
-        if recurrence == "daily":
-            return last_completion + timedelta(days=1)
-        elif recurrence == "weekly":
-            return last_completion + timedelta(weeks=1)
-        elif recurrence == "monthly":
-            # Simple monthly - same day next month
-            next_month = last_completion.month + 1
-            next_year = last_completion.year
-            if next_month > 12:
-                next_month = 1
-                next_year += 1
-
-            # Handle months with different number of days
-            import calendar
-            max_day = calendar.monthrange(next_year, next_month)[1]
-            next_day = min(last_completion.day, max_day)
-
-            return last_completion.replace(year=next_year, month=next_month, day=next_day)
-        elif recurrence == "custom" and recurrence_rule:
-            # In a real implementation, parse the recurrence_rule using a library like dateutil.rrule
-            # For now, we'll implement basic custom patterns
-            if "every_2_days" in recurrence_rule:
-                return last_completion + timedelta(days=2)
-            elif "every_weekday" in recurrence_rule:
-                # Find next weekday
-                next_date = last_completion + timedelta(days=1)
-                while next_date.weekday() >= 5:  # Saturday=5, Sunday=6
-                    next_date += timedelta(days=1)
-                return next_date
-            else:
-                logger.warning(f"Unsupported custom recurrence rule: {recurrence_rule}")
-                return None
-        else:
-            return None
+    def build_next_occurrence(self, completed_task: Task, now: Optional[datetime] = None) -> Optional[Task]:
+        """Build (without saving) the next occurrence of a completed recurring task.
 
-    def create_next_occurrence(self, completed_task: Task) -> Optional[Task]:
-        """Create the next occurrence of a recurring task."""
+        Batch callers pass one shared `now` so every occurrence in the batch
+        is stamped with the same instant.
+        """
         if not completed_task.recurrence:
             return None
 
+        if now is None:
+            now = utc_now()
+
         next_occurrence = self.calculate_next_occurrence(
             completed_task.recurrence,
             completed_task.recurrence_rule,
-            datetime.utcnow()
+            now
         )
 
         if not next_occurrence:
             return None
 
         # Create new task with same properties as original
-        new_task = Task(
+        return Task(
             user_id=completed_task.user_id,
             title=completed_task.title,
             description=completed_task.description,
             completed=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+            created_at=now,
+            updated_at=now,
             priority=completed_task.priority,
+            priority_rank=completed_task.priority_rank,
             due_date=next_occurrence,  # Set due date to the next occurrence
             tags=completed_task.tags,
             recurrence=completed_task.recurrence,
@@ -107,91 +178,325 @@ class RecurringTaskService:
             next_occurrence=None  # Will be calculated for the next occurrence
         )
 
+    def persist_new_tasks(self, session: Session, tasks: List[Task], return_ids: bool = True) -> List[Task]:
+        """
+        Insert new tasks in one round-trip without committing.
+
+        Args:
+            session: Open database session; the caller commits
+            tasks: Unsaved Task objects
+            return_ids: Populate task.id from INSERT ... RETURNING (needed for
+                publishing events); otherwise use a plain bulk save
+
+        Returns:
+            The given tasks
+        """
+        if not tasks:
+            return tasks
+
+        # Tag rows need the new ids, so on SQLite tagged tasks always take the RETURNING path
+        if not return_ids and not (IS_SQLITE and any(task.tags for task in tasks)):
+            session.bulk_save_objects(tasks, return_defaults=False)
+            return tasks
+
+        rows = [task.model_dump(exclude={"id"}) for task in tasks]
+        statement = insert(Task).returning(Task.id, sort_by_parameter_order=True)
+        new_ids = session.execute(statement, rows).scalars().all()
+        for task, new_id in zip(tasks, new_ids):
+            task.id = new_id
+
+        # Core INSERTs skip the mapper events, so mirror the tags here
+        sync_task_tags(session, [task for task in tasks if task.tags])
+        return tasks
+
+    def create_next_occurrence(self, completed_task: Task) -> Optional[Task]:
+        """Create the next occurrence of a recurring task."""
+        new_task = self.build_next_occurrence(completed_task)
+        if not new_task:
+            return None
+
         # Save to database
         with Session(self.engine) as session:
-            session.add(new_task)
+            self.persist_new_tasks(session, [new_task])
             session.commit()
-            session.refresh(new_task)
 
         logger.info(f"Created next occurrence of task {completed_task.id}: new task {new_task.id}")
         return new_task
 
-    def process_task_completed_event(self, event_data: Dict[str, Any]) -> bool:
-        """Process a task.completed event and create next occurrence if needed."""
+    @staticmethod
+    def _task_created_outbox(next_task: Task) -> OutboxEvent:
+        """Build the outbox row for a task.created event of a newly created occurrence."""
+        new_task_data = {
+            "id": next_task.id,
+            "user_id": next_task.user_id,
+            "title": next_task.title,
+            "due_date": next_task.due_date.isoformat() if next_task.due_date else None
+        }
+        return OutboxEvent(
+            topic="task-events",
+            payload=json.dumps({"event_id": f"next_occurrence_{next_task.id}", "type": "task.created", "data": new_task_data})
+        )
+
+    def _pending_outbox(self, limit: int = OUTBOX_DRAIN_LIMIT) -> List[Tuple[int, str, str]]:
+        """Oldest undelivered outbox events as (id, topic, payload)."""
+        with Session(self.engine) as session:
+            statement = (
+                select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload)
+                .order_by(OutboxEvent.id)
+                .limit(limit)
+            )
+            return [tuple(row) for row in session.exec(statement).all()]
+
+    def _mark_delivered(self, outbox_ids: List[int]):
+        """Remove delivered events from the outbox."""
+        if not outbox_ids:
+            return
+        with Session(self.engine) as session:
+            session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(outbox_ids)))
+            session.commit()
+
+    def _publish_outbox_event(self, topic: str, payload: str):
+        """Publish one outbox event through the shared Dapr client."""
+        self._dapr.publish_event(
+            pubsub_name="task-pubsub",
+            topic_name=topic,
+            data=payload,
+            data_content_type="application/json"
+        )
+
+    def flush_outbox(self) -> int:
+        """
+        Publish pending outbox events one by one on the calling thread.
+
+        Returns 0 without publishing if another drain is already running;
+        that drain, or the next one, picks the events up.
+        """
+        if self._dapr is None or not self._outbox_lock.acquire(blocking=False):
+            return 0
+
         try:
-            task_id = event_data.get("id")
-            user_id = event_data.get("user_id")
+            delivered = []
+            for outbox_id, topic, payload in self._pending_outbox():
+                try:
+                    self._publish_outbox_event(topic, payload)
+                    delivered.append(outbox_id)
+                except Exception as e:
+                    logger.error(f"Failed to publish outbox event {outbox_id}: {str(e)}")
+            self._mark_delivered(delivered)
+            return len(delivered)
+        finally:
+            self._outbox_lock.release()
+
+    async def drain_outbox(self, slots: asyncio.Semaphore) -> int:
+        """
+        Publish pending outbox events concurrently, bounded by `slots`.
+
+        Like flush_outbox, skips the round if another drain is running.
+        """
+        if not self._outbox_lock.acquire(blocking=False):
+            return 0
 
-            if not task_id:
+        try:
+            entries = await asyncio.to_thread(self._pending_outbox)
+            delivered = []
+
+            async def publish(outbox_id: int, topic: str, payload: str):
+                async with slots:
+                    try:
+                        await asyncio.to_thread(self._publish_outbox_event, topic, payload)
+                        delivered.append(outbox_id)
+                    except Exception as e:
+                        logger.error(f"Failed to publish outbox event {outbox_id}: {str(e)}")
+
+            await asyncio.gather(*(publish(*entry) for entry in entries))
+            await asyncio.to_thread(self._mark_delivered, delivered)
+            return len(delivered)
+        finally:
+            self._outbox_lock.release()
+
+    async def _run_outbox_publisher(self):
+        """Background publisher: drain the outbox after each batch, and periodically retry failures."""
+        slots = asyncio.Semaphore(PUBLISH_MAX_IN_FLIGHT)
+        while True:
+            try:
+                await asyncio.wait_for(self._outbox_ready.wait(), OUTBOX_RETRY_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._outbox_ready.clear()
+            try:
+                await self.drain_outbox(slots)
+            except Exception as e:
+                logger.error(f"Error draining outbox: {str(e)}")
+
+    def fetch_tasks_bulk(self, session: Session, pairs: List[Tuple[int, str]]) -> Dict[int, Task]:
+        """
+        Load several tasks with a single query.
+
+        Args:
+            session: Open database session
+            pairs: (task_id, user_id) pairs to look up
+
+        Returns:
+            Dict of task_id to Task, containing only tasks owned by the paired user
+        """
+        if not pairs:
+            return {}
+
+        wanted = set(pairs)
+        statement = select(Task).where(Task.id.in_({task_id for task_id, _ in wanted}))
+        return {
+            task.id: task
+            for task in session.exec(statement).all()
+            if (task.id, task.user_id) in wanted
+        }
+
+    def process_task_completed_batch(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Process a batch of task.completed events in a single transaction.
+
+        Args:
+            events: task.completed event payloads
+
+        Returns:
+            Number of next occurrences created
+
+        Raises:
+            Exception: If the batch could not be committed; the caller should
+                redeliver the whole batch
+        """
+        pairs = set()
+        for event_data in events:
+            if not event_data.get("id"):
                 logger.error("Missing task_id in event data")
-                return False
+                continue
+            pairs.add((event_data.get("id"), event_data.get("user_id")))
 
-            # Get the completed task from database
-            with Session(self.engine) as session:
-                statement = select(Task).where(Task.id == task_id, Task.user_id == user_id)
-                task = session.exec(statement).first()
+        if not pairs:
+            return 0
+
+        with Session(self.engine) as session:
+            tasks = self.fetch_tasks_bulk(session, list(pairs))
 
-                if not task:
+            now = utc_now()
+            new_tasks = []
+            for task_id, user_id in pairs:
+                task = tasks.get(task_id)
+                if not task or task.user_id != user_id:
                     logger.error(f"Task {task_id} not found for user {user_id}")
-                    return False
-
-                # Check if this task has recurrence
-                if task.recurrence:
-                    next_task = self.create_next_occurrence(task)
-                    if next_task:
-                        logger.info(f"Successfully created next occurrence for task {task_id}: new task {next_task.id}")
-
-                        # In production, publish an event for the new task creation
-                        if self.dapr_available:
-                            try:
-                                with DaprClient() as client:
-                                    new_task_data = {
-                                        "id": next_task.id,
-                                        "user_id": next_task.user_id,
-                                        "title": next_task.title,
-                                        "due_date": next_task.due_date.isoformat() if next_task.due_date else None
-                                    }
-
-                                    client.publish_event(
-                                        pubsub_name="task-pubsub",
-                                        topic_name="task-events",
-                                        data={"event_id": f"next_occurrence_{next_task.id}", "type": "task.created", "data": new_task_data},
-                                        data_content_type="application/json"
-                                    )
-                            except Exception as e:
-                                logger.error(f"Failed to publish task.created event: {str(e)}")
-
-                        return True
-                else:
-                    logger.info(f"Task {task_id} does not have recurrence, skipping next occurrence creation")
+                    continue
+                if not task.recurrence:
+                    logger.info(f"Task {task.id} does not have recurrence, skipping next occurrence creation")
+                    continue
+
+                new_task = self.build_next_occurrence(task, now)
+                if new_task:
+                    new_tasks.append(new_task)
+
+            if not new_tasks:
+                return 0
+
+            self.persist_new_tasks(session, new_tasks)
+            # task.created events commit atomically with the tasks and are
+            # published afterwards, so a failed publish is retried, not lost.
+            # Without a sidecar nothing would ever drain them
+            if self._dapr is not None:
+                session.add_all(self._task_created_outbox(new_task) for new_task in new_tasks)
+            session.commit()
+
+        logger.info(f"Created {len(new_tasks)} next occurrences from a batch of {len(events)} events")
+
+        return len(new_tasks)
+
+    async def submit_event(self, event_data: Dict[str, Any]) -> bool:
+        """
+        Queue a task.completed event for batched processing.
 
+        Intended for the Dapr subscription handler: the returned flag is the
+        outcome of the whole batch the event was processed in, so the handler
+        can ack (True) or ask Dapr to redeliver (False).
+        """
+        self._ensure_batcher()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((event_data, future))
+        return await future
+
+    def _ensure_batcher(self):
+        """Create the event queue and start the batcher task if it isn't running."""
+        if self._pending is None:
+            self._pending = asyncio.Queue()
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.create_task(self._run_batcher())
+
+    async def _run_batcher(self):
+        """Process queued task.completed events in batches and resolve their futures."""
+        while True:
+            batch = await self._next_batch()
+            try:
+                # Run the blocking DB/Dapr work off the event loop
+                await asyncio.to_thread(self.process_task_completed_batch, [event for event, _ in batch])
+                success = True
+                # Publishing happens in the background; don't hold the next batch for it
+                if self._outbox_ready is not None:
+                    self._outbox_ready.set()
+            except Exception as e:
+                logger.error(f"Error in recurring task consumer: {str(e)}")
+                success = False
+
+            # Ack or nack the whole batch at once
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(success)
+
+    async def _next_batch(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        """Wait for the first queued event, then collect more until the batch is full or times out."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._pending.get()]
+        deadline = loop.time() + BATCH_TIMEOUT_MS / 1000
+
+        while len(batch) < BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def process_task_completed_event(self, event_data: Dict[str, Any]) -> bool:
+        """Process a task.completed event and create next occurrence if needed."""
+        try:
+            created = self.process_task_completed_batch([event_data]) > 0
+            if created:
+                self.flush_outbox()
+            return created
         except Exception as e:
             logger.error(f"Error processing task.completed event: {str(e)}")
             return False
 
-        return False
-
     async def start_consumer(self):
         """Start consuming task.completed events from Kafka via Dapr."""
+        # Events submitted through submit_event are batched with or without Dapr
+        self._ensure_batcher()
+
         if not self.dapr_available:
             logger.info("Dapr not available - running in development mode without Kafka consumption")
             return
 
         logger.info("Starting recurring task service consumer...")
 
+        self._outbox_ready = asyncio.Event()
+        self._outbox_publisher = asyncio.create_task(self._run_outbox_publisher())
+
+        # Runs until cancelled; restarts the batcher if it ever dies
         while True:
             try:
-                # In a real implementation, this would connect to Kafka via Dapr
-                # For now, we'll simulate event consumption
-                with DaprClient() as client:
-                    # Subscribe to task-events topic and listen for task.completed events
-                    # This is a simplified version - in reality you'd need to implement
-                    # proper event subscription and processing
-                    pass
-
+                await self._batcher
             except Exception as e:
-                logger.error(f"Error in recurring task consumer: {str(e)}")
-                await asyncio.sleep(5)  # Wait before retrying
+                logger.error(f"Recurring task batcher stopped: {str(e)}")
+            self._ensure_batcher()
 
     def run_dev_mode(self):
         """Run in development mode without Dapr/Kafka."""
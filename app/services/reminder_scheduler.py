@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List
 from sqlmodel import Session, select
 from app.models.task import Task
+from app.services.task_service import parse_iso_datetime
 from app.dapr.client import dapr_publisher
 
 
@@ -12,6 +13,17 @@ class ReminderScheduler:
     def __init__(self, db_session: Session):
         self.db = db_session
 
+    @staticmethod
+    def _build_reminder_event(task: Any) -> Dict[str, Any]:
+        """Build the task.due_scheduled payload from a Task or a selected row."""
+        return {
+            "task_id": task.id,
+            "user_id": task.user_id,
+            "due_date": task.due_date.isoformat(),
+            "title": task.title,
+            "priority": task.priority
+        }
+
     def schedule_reminders_for_task(self, task: Task) -> bool:
         """
         Schedule reminders for a task based on due date.
@@ -25,18 +37,9 @@ class ReminderScheduler:
         if not task.due_date:
             return False
 
-        # Create reminder event
-        reminder_data = {
-            "task_id": task.id,
-            "user_id": task.user_id,
-            "due_date": task.due_date.isoformat(),
-            "title": task.title,
-            "priority": task.priority
-        }
-
         # Publish reminder event
         try:
-            dapr_publisher.publish_reminder_scheduled(reminder_data)
+            dapr_publisher.publish_reminder_scheduled(self._build_reminder_event(task))
             return True
         except Exception as e:
             print(f"Failed to schedule reminder for task {task.id}: {str(e)}")
@@ -55,26 +58,27 @@ class ReminderScheduler:
         now = datetime.utcnow()
         target_time = now + timedelta(minutes=minutes_ahead)
 
-        # Query for tasks with due dates in the specified range
-        statement = select(Task).where(
+        # Query only the columns the reminders need, in the specified range
+        statement = select(
+            Task.id, Task.user_id, Task.title, Task.due_date, Task.priority, Task.description
+        ).where(
             Task.due_date <= target_time,
             Task.due_date >= now,
             Task.completed == False
         )
-        tasks = self.db.exec(statement).all()
-
-        reminder_tasks = []
-        for task in tasks:
-            reminder_tasks.append({
-                "task_id": task.id,
-                "user_id": task.user_id,
-                "title": task.title,
-                "due_date": task.due_date,
-                "priority": task.priority,
-                "description": task.description
-            })
-
-        return reminder_tasks
+        rows = self.db.exec(statement).all()
+
+        return [
+            {
+                "task_id": row.id,
+                "user_id": row.user_id,
+                "title": row.title,
+                "due_date": row.due_date,
+                "priority": row.priority,
+                "description": row.description
+            }
+            for row in rows
+        ]
 
     def schedule_periodic_reminders(self, hours_before_due: int = 24) -> int:
         """
@@ -89,20 +93,23 @@ class ReminderScheduler:
         now = datetime.utcnow()
         target_time = now + timedelta(hours=hours_before_due)
 
-        # Query for tasks with due dates at the target time
-        statement = select(Task).where(
+        # Query for tasks with due dates at the target time, reminder columns only
+        statement = select(
+            Task.id, Task.user_id, Task.title, Task.due_date, Task.priority
+        ).where(
             Task.due_date <= target_time,
             Task.due_date >= now,
             Task.completed == False
         )
-        tasks = self.db.exec(statement).all()
+        rows = self.db.exec(statement).all()
 
-        scheduled_count = 0
-        for task in tasks:
-            if self.schedule_reminders_for_task(task):
-                scheduled_count += 1
+        events = [self._build_reminder_event(row) for row in rows if row.due_date]
+        if not events:
+            return 0
 
-        return scheduled_count
+        # One bulk publish; failed entries are retried individually
+        results = dapr_publisher.publish_reminders_bulk(events)
+        return sum(results)
 
     def validate_reminder_request(self, task_id: int, user_id: str, due_date: str) -> Dict[str, Any]:
         """
@@ -136,9 +143,7 @@ class ReminderScheduler:
             result["warnings"].append(f"Task {task_id} is already completed")
 
         # Validate due date format
-        try:
-            datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-        except ValueError:
+        if parse_iso_datetime(due_date) is None:
             result["valid"] = False
             result["errors"].append(f"Invalid due date format: {due_date}")
 
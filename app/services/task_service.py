@@ -1,16 +1,35 @@
 """Task service for Phase V Advanced Task Management."""
 from sqlmodel import Session, select
-from typing import List, Optional
+from sqlalchemy import delete, insert, not_, tuple_, update
+from typing import Iterator, List, Optional, Tuple, Union
 from datetime import datetime, date
+from functools import lru_cache
 import json
 import os
 
-from app.models.task import Task
+from app.models.task import Task, priority_rank, sync_task_tags, utc_now
+from app.models.task_tag import TaskTag
 
 # Determine database type for compatibility
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./todo_app.db")
 IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
+_PRIORITIES = frozenset(("high", "medium", "low"))
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 string (accepting a trailing 'Z'), memoized per string."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def parse_iso_datetime(value: str) -> Optional[datetime]:
+    """Parse an API-supplied ISO 8601 string, returning None if it is invalid."""
+    try:
+        return _parse_iso(value)
+    except (ValueError, TypeError):
+        return None
+
 
 class TaskService:
     """Service class for advanced task CRUD operations with priorities, due dates, tags, and recurrence."""
@@ -27,53 +46,78 @@ class TaskService:
         due_date: Optional[str] = None,
         tags: Optional[List[str]] = None,
         recurrence: Optional[str] = None,
-        recurrence_rule: Optional[str] = None
+        recurrence_rule: Optional[str] = None,
+        track: bool = False
     ) -> Task:
-        """Create a new task with advanced features."""
+        """Create a new task with advanced features.
+
+        By default the row is written with a single Core INSERT ... RETURNING id,
+        skipping the ORM unit of work and the post-commit refresh; the returned
+        Task is detached. Pass track=True to get a session-attached instance.
+        """
         # Validate priority
-        if priority not in ["high", "medium", "low"]:
+        if priority not in _PRIORITIES:
             priority = "medium"
 
         # Convert due_date string to datetime if provided
-        due_datetime = None
-        if due_date:
-            try:
-                due_datetime = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-            except ValueError:
-                # If parsing fails, ignore the due_date
-                due_datetime = None
+        # If parsing fails, ignore the due_date
+        due_datetime = parse_iso_datetime(due_date) if due_date else None
 
+        now = utc_now()
         task = Task(
             user_id=user_id,
             title=title,
             description=description,
             completed=False,
             priority=priority,
+            priority_rank=priority_rank(priority),
             due_date=due_datetime,
             tags=tags or [],
             recurrence=recurrence,
             recurrence_rule=recurrence_rule,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            created_at=now,
+            updated_at=now
         )
 
-        self.session.add(task)
+        if track:
+            # task_tag rows are written by the Task mapper events
+            self.session.add(task)
+            self.session.commit()
+            self.session.refresh(task)
+            return task
+
+        statement = insert(Task).values(**task.model_dump(exclude={"id"})).returning(Task.id)
+        task.id = self.session.execute(statement).scalar_one()
+        if tags:
+            # Core INSERTs skip the mapper events, so mirror the tags here
+            sync_task_tags(self.session, [task])
         self.session.commit()
-        self.session.refresh(task)
         return task
 
-    def get_by_user_advanced(
+    def _build_user_advanced_statement(
         self,
         user_id: str,
         filter_type: str = "all",
         priority: Optional[str] = None,
         tag: Optional[str] = None,
-        due_from: Optional[str] = None,
-        due_to: Optional[str] = None,
+        due_from: Optional[Union[str, datetime]] = None,
+        due_to: Optional[Union[str, datetime]] = None,
         sort_by: str = "created_at",
-        search: Optional[str] = None
-    ) -> List[Task]:
-        """Get all tasks for a user with advanced filtering and sorting."""
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ):
+        """Build the filtered and sorted task query used by the advanced listing methods.
+
+        ``after`` is a keyset cursor of the last seen task's (created_at, id);
+        it applies to the default created_at ordering only.
+
+        Raises:
+            ValueError: If ``after`` is combined with another sort order
+        """
+        if after is not None and sort_by in ("due_date", "priority", "title"):
+            raise ValueError("Keyset cursor is only supported with sort_by=created_at")
+
         statement = select(Task).where(Task.user_id == user_id)
 
         # Apply filter by completion status
@@ -89,27 +133,25 @@ class TaskService:
         # Apply tag filter
         if tag:
             if IS_SQLITE:
-                # For SQLite, check if the JSON string contains the tag
-                # Using LIKE operator to search for the tag in the JSON array string
-                statement = statement.where(Task.tags.like(f'%{tag}%'))
+                # For SQLite, match exact tags through the indexed task_tag table
+                statement = statement.where(
+                    Task.id.in_(select(TaskTag.task_id).where(TaskTag.user_id == user_id, TaskTag.tag == tag))
+                )
             else:
                 # For PostgreSQL, use the @> operator to check if array contains specific value
                 statement = statement.where(Task.tags.op('@>')(f'{{{tag}}}'))
 
-        # Apply due date range filters
+        # Apply due date range filters (the router hands over parsed datetimes,
+        # other callers may still pass ISO strings)
+        if isinstance(due_from, str):
+            due_from = parse_iso_datetime(due_from)  # Ignore invalid date format
         if due_from:
-            try:
-                from_date = datetime.fromisoformat(due_from.replace('Z', '+00:00'))
-                statement = statement.where(Task.due_date >= from_date)
-            except ValueError:
-                pass  # Ignore invalid date format
+            statement = statement.where(Task.due_date >= due_from)
 
+        if isinstance(due_to, str):
+            due_to = parse_iso_datetime(due_to)  # Ignore invalid date format
         if due_to:
-            try:
-                to_date = datetime.fromisoformat(due_to.replace('Z', '+00:00'))
-                statement = statement.where(Task.due_date <= to_date)
-            except ValueError:
-                pass  # Ignore invalid date format
+            statement = statement.where(Task.due_date <= due_to)
 
         # Apply search filter (title and description)
         if search:
@@ -124,30 +166,57 @@ class TaskService:
             statement = statement.order_by(Task.due_date.asc().nullslast())
         elif sort_by == "priority":
             # Sort by priority: high, medium, low
-            from sqlalchemy import case
-            statement = statement.order_by(
-                case(
-                    (Task.priority == 'high', 1),
-                    (Task.priority == 'medium', 2),
-                    (Task.priority == 'low', 3),
-                    else_=4
-                ).asc(),
-                Task.created_at.desc()
-            )
+            statement = statement.order_by(Task.priority_rank.asc(), Task.created_at.desc())
         elif sort_by == "title":
             statement = statement.order_by(Task.title.asc())
-        else:  # Default to created_at
-            statement = statement.order_by(Task.created_at.desc())
+        else:  # Default to created_at, id breaks ties so the keyset cursor is stable
+            if after is not None:
+                statement = statement.where(tuple_(Task.created_at, Task.id) < tuple(after))
+            statement = statement.order_by(Task.created_at.desc(), Task.id.desc())
 
-        tasks = list(self.session.exec(statement).all())
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if IS_SQLITE:
-            for task in tasks:
-                # Access the tags_serialized property to ensure proper deserialization
-                _ = task.tags_serialized
-        
-        return tasks
+        if limit is not None:
+            statement = statement.limit(limit)
+
+        return statement
+
+    def get_by_user_advanced(
+        self,
+        user_id: str,
+        filter_type: str = "all",
+        priority: Optional[str] = None,
+        tag: Optional[str] = None,
+        due_from: Optional[Union[str, datetime]] = None,
+        due_to: Optional[Union[str, datetime]] = None,
+        sort_by: str = "created_at",
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Task]:
+        """Get all tasks for a user with advanced filtering and sorting."""
+        statement = self._build_user_advanced_statement(
+            user_id, filter_type, priority, tag, due_from, due_to, sort_by, search, limit, after
+        )
+        return list(self.session.exec(statement).all())
+
+    def iter_by_user_advanced(
+        self,
+        user_id: str,
+        filter_type: str = "all",
+        priority: Optional[str] = None,
+        tag: Optional[str] = None,
+        due_from: Optional[Union[str, datetime]] = None,
+        due_to: Optional[Union[str, datetime]] = None,
+        sort_by: str = "created_at",
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        chunk_size: int = 500
+    ) -> Iterator[Task]:
+        """Yield a user's tasks with the same filters as get_by_user_advanced, fetching rows in chunks."""
+        statement = self._build_user_advanced_statement(
+            user_id, filter_type, priority, tag, due_from, due_to, sort_by, search, limit, after
+        ).execution_options(yield_per=chunk_size)
+        yield from self.session.exec(statement)
 
     def get_by_id(self, task_id: int, user_id: str) -> Optional[Task]:
         """Get a specific task by ID, ensuring user ownership."""
@@ -156,14 +225,7 @@ class TaskService:
             .where(Task.id == task_id)
             .where(Task.user_id == user_id)
         )
-        task = self.session.exec(statement).first()
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if task and IS_SQLITE:
-            # Access the tags_serialized property to ensure proper deserialization
-            _ = task.tags_serialized
-        
-        return task
+        return self.session.exec(statement).first()
 
     def update_advanced(
         self,
@@ -190,58 +252,61 @@ class TaskService:
 
         # Update advanced fields
         if priority is not None:
-            if priority in ["high", "medium", "low"]:
+            if priority in _PRIORITIES:
                 task.priority = priority
+                task.priority_rank = priority_rank(priority)
         if due_date is not None:
-            try:
-                task.due_date = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-            except ValueError:
-                # If parsing fails, ignore the due_date update
-                pass
+            due_datetime = parse_iso_datetime(due_date)
+            # If parsing fails, ignore the due_date update
+            if due_datetime is not None:
+                task.due_date = due_datetime
         if tags is not None:
-            task.tags = tags
+            task.tags = tags  # task_tag is rewritten by the Task mapper events on flush
         if recurrence is not None:
             task.recurrence = recurrence
         if recurrence_rule is not None:
             task.recurrence_rule = recurrence_rule
 
-        task.updated_at = datetime.utcnow()
+        task.updated_at = utc_now()
         self.session.commit()
         self.session.refresh(task)
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if IS_SQLITE:
-            # Access the tags_serialized property to ensure proper deserialization
-            _ = task.tags_serialized
-        
         return task
 
     def delete(self, task_id: int, user_id: str) -> bool:
-        """Delete a task, ensuring user ownership."""
-        task = self.get_by_id(task_id, user_id)
-        if not task:
-            return False
+        """Delete a task, ensuring user ownership.
 
-        self.session.delete(task)
+        The ownership check is part of the DELETE itself, so this is one
+        statement instead of a SELECT followed by a DELETE.
+        """
+        statement = (
+            delete(Task)
+            .where(Task.id == task_id, Task.user_id == user_id)
+            .returning(Task.id)
+        )
+        deleted_id = self.session.execute(statement).scalar_one_or_none()
         self.session.commit()
-        return True
+        return deleted_id is not None
 
     def toggle_complete(self, task_id: int, user_id: str) -> Optional[Task]:
-        """Toggle task completion status."""
-        task = self.get_by_id(task_id, user_id)
-        if not task:
+        """Toggle task completion status.
+
+        Flips the flag with a single UPDATE ... RETURNING scoped to the owner;
+        returns None when no such task exists for the user.
+        """
+        statement = (
+            update(Task)
+            .where(Task.id == task_id, Task.user_id == user_id)
+            .values(completed=not_(Task.completed), updated_at=utc_now())
+            .returning(Task)
+        )
+        task = self.session.execute(statement).scalars().first()
+        if task is None:
+            self.session.rollback()
             return None
 
-        task.completed = not task.completed
-        task.updated_at = datetime.utcnow()
+        # Detach so the commit does not expire the returned row and force a reload
+        self.session.expunge(task)
         self.session.commit()
-        self.session.refresh(task)
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if IS_SQLITE:
-            # Access the tags_serialized property to ensure proper deserialization
-            _ = task.tags_serialized
-        
         return task
 
     def get_by_priority(self, user_id: str, priority: str) -> List[Task]:
@@ -253,25 +318,17 @@ class TaskService:
             .where(Task.completed == False)  # Only return pending tasks
             .order_by(Task.created_at.desc())
         )
-        tasks = list(self.session.exec(statement).all())
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if IS_SQLITE:
-            for task in tasks:
-                # Access the tags_serialized property to ensure proper deserialization
-                _ = task.tags_serialized
-        
-        return tasks
+        return list(self.session.exec(statement).all())
 
     def get_by_tag(self, user_id: str, tag: str) -> List[Task]:
         """Get tasks filtered by tag."""
         if IS_SQLITE:
-            # For SQLite, check if the JSON string contains the tag
-            # Using LIKE operator to search for the tag in the JSON array string
+            # For SQLite, match exact tags through the indexed task_tag table
             statement = (
                 select(Task)
-                .where(Task.user_id == user_id)
-                .where(Task.tags.like(f'%{tag}%'))
+                .join(TaskTag, TaskTag.task_id == Task.id)
+                .where(TaskTag.user_id == user_id)
+                .where(TaskTag.tag == tag)
                 .order_by(Task.created_at.desc())
             )
         else:
@@ -282,15 +339,7 @@ class TaskService:
                 .where(Task.tags.op('@>')(f'{{{tag}}}'))  # PostgreSQL array contains operator for ARRAY type
                 .order_by(Task.created_at.desc())
             )
-        tasks = list(self.session.exec(statement).all())
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if IS_SQLITE:
-            for task in tasks:
-                # Access the tags_serialized property to ensure proper deserialization
-                _ = task.tags_serialized
-        
-        return tasks
+        return list(self.session.exec(statement).all())
 
     def get_recurring_tasks(self, user_id: str) -> List[Task]:
         """Get all recurring tasks for a user."""
@@ -300,15 +349,7 @@ class TaskService:
             .where(Task.recurrence.is_not(None))
             .order_by(Task.created_at.desc())
         )
-        tasks = list(self.session.exec(statement).all())
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if IS_SQLITE:
-            for task in tasks:
-                # Access the tags_serialized property to ensure proper deserialization
-                _ = task.tags_serialized
-        
-        return tasks
+        return list(self.session.exec(statement).all())
 
     def get_tasks_by_due_range(self, user_id: str, start_date: datetime, end_date: datetime) -> List[Task]:
         """Get tasks with due dates in a specific range."""
@@ -319,12 +360,4 @@ class TaskService:
             .where(Task.due_date <= end_date)
             .order_by(Task.due_date.asc())
         )
-        tasks = list(self.session.exec(statement).all())
-        
-        # For SQLite, ensure tags are properly formatted for API response
-        if IS_SQLITE:
-            for task in tasks:
-                # Access the tags_serialized property to ensure proper deserialization
-                _ = task.tags_serialized
-        
-        return tasks
+        return list(self.session.exec(statement).all())
@@ -6,10 +6,15 @@ Consumes reminder events from Kafka and sends notifications to users.
 
 import asyncio
 import logging
+import os
+import random
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import pytz
-from sqlmodel import create_engine, Session, select
+from typing import Dict, Any, List, Optional, Tuple
+import httpx
+from dataclasses import asdict
+from sqlalchemy import insert, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
 
 # Import dapr if available, otherwise provide fallback
 try:
@@ -20,23 +25,54 @@ except ImportError:
     DAPR_AVAILABLE = False
     DaprClient = None
 
-from ..models.notification import Notification
+from ..db import ENGINE
+from ..models.notification import Notification, NotificationRow
+from ..utils.dates import parse_due, utc_now
 
 logger = logging.getLogger(__name__)
 
+# Dapr sidecar HTTP publish endpoint for notification.sent events
+DAPR_HTTP_PORT = os.environ.get("DAPR_HTTP_PORT", "3500")
+NOTIFICATIONS_PUBLISH_URL = f"http://localhost:{DAPR_HTTP_PORT}/v1.0/publish/task-pubsub/notifications"
+NOTIFICATIONS_BULK_PUBLISH_URL = f"http://localhost:{DAPR_HTTP_PORT}/v1.0-alpha1/publish/bulk/task-pubsub/notifications"
+
+# Reminder events are accumulated and processed in batches flushed on size or timeout
+REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE", "1000"))
+REMINDER_BATCH_WAIT_MS = int(os.environ.get("REMINDER_BATCH_WAIT_MS", "500"))
+# Upper bound on queued events; producers wait once it is reached (back-pressure)
+REMINDER_QUEUE_MAXSIZE = int(os.environ.get("REMINDER_QUEUE_MAXSIZE", "10000"))
+
+# Reminder text per priority, used when the event has no due date
+_PRIORITY_TEMPLATES = {
+    "high": "🚨 HIGH PRIORITY: Task '{0}' is due soon!",
+    "low": "↘️ Low priority reminder: Task '{0}' is due soon.",
+    "medium": "⏰ Reminder: Task '{0}' is due soon!",
+}
+
+# Reconnect backoff: full jitter over an exponentially growing window
+RETRY_BASE_SECONDS = 0.1
+RETRY_CAP_SECONDS = 30.0
+RETRY_MAX_EXPONENT = 10
+
+# How often the consumer loop wakes while the subscription is open
+CONSUMER_IDLE_SECONDS = 1.0
+
 class ReminderConsumer:
     """Consumer to handle reminder events and send notifications."""
 
-    def __init__(self, database_url: str):
+    def __init__(self, engine: Engine = ENGINE):
         """Initialize the reminder consumer."""
-        self.engine = create_engine(database_url)
+        self.engine = engine
         self.dapr_available = DAPR_AVAILABLE
+        self._http: Optional[httpx.AsyncClient] = None
+        self._pending: Optional["asyncio.Queue[Tuple[Dict[str, Any], asyncio.Future]]"] = None
+        self._batcher: Optional[asyncio.Task] = None
 
         if not self.dapr_available:
             logger.warning("Dapr not available. Running in development mode without Dapr integration.")
 
-    def send_notification(self, user_id: str, task_id: int, title: str, due_date: str, message: str, channel: str = "push"):
-        """Send a notification to the user."""
+    def _build_notification(self, user_id: str, task_id: int, title: str, due_date: str, message: str, channel: str = "push") -> NotificationRow:
+        """Send a notification to the user and build its (unsaved) record."""
         # In a real implementation, this would send an actual notification
         # (email, push notification, SMS, etc.)
         # For now, we'll just log it
@@ -44,22 +80,55 @@ class ReminderConsumer:
         logger.info(f"Channel: {channel}, Message: {message}")
 
         # Save notification record
-        notification = Notification(
+        notification = NotificationRow(
             task_id=task_id,
             user_id=user_id,
-            scheduled_time=datetime.fromisoformat(due_date.replace('Z', '+00:00')) if due_date else datetime.utcnow(),
-            sent_time=datetime.utcnow(),
+            scheduled_time=parse_due(due_date),
+            sent_time=utc_now(),
             status="sent",
             delivery_attempts=1,
             channel=channel,
             message_content=message
         )
 
+        return notification
+
+    def send_notification(self, user_id: str, task_id: int, title: str, due_date: str, message: str, channel: str = "push"):
+        """Send a notification to the user."""
+        self.save_notifications([self._build_notification(user_id, task_id, title, due_date, message, channel)])
+
+    def save_notifications(self, notifications: List[NotificationRow]):
+        """Insert notification records with one Core executemany INSERT, bypassing the ORM unit of work."""
         with Session(self.engine) as session:
-            session.add(notification)
+            session.execute(insert(Notification.__table__), [asdict(notification) for notification in notifications])
             session.commit()
 
-    def process_reminder_event(self, event_data: Dict[str, Any]) -> bool:
+    @staticmethod
+    def _build_message(title: str, priority: str, due_date: Optional[str]) -> str:
+        """Reminder text for an event; a due date takes precedence over priority."""
+        if due_date:
+            return f"⏰ URGENT REMINDER: Task '{title}' is due at {due_date}"
+        return _PRIORITY_TEMPLATES.get(priority, _PRIORITY_TEMPLATES["medium"]).format(title)
+
+    async def _publish_notification_sent(self, task_id: int, user_id: str, channel: str):
+        """Publish a notification.sent event through the sidecar's HTTP API without blocking."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=5.0)
+
+        notification_event = {
+            "task_id": task_id,
+            "user_id": user_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "status": "sent",
+            "channel": channel
+        }
+        response = await self._http.post(
+            NOTIFICATIONS_PUBLISH_URL,
+            json={"event_id": f"notification_{task_id}", "type": "notification.sent", "data": notification_event}
+        )
+        response.raise_for_status()
+
+    async def process_reminder_event(self, event_data: Dict[str, Any]) -> bool:
         """Process a reminder event and send notification."""
         try:
             task_id = event_data.get("task_id")
@@ -73,37 +142,15 @@ class ReminderConsumer:
                 logger.error("Missing required fields in reminder event data")
                 return False
 
-            # Send notification based on priority
-            if priority == "high":
-                message = f"🚨 HIGH PRIORITY: Task '{title}' is due soon!"
-            elif priority == "low":
-                message = f"↘️ Low priority reminder: Task '{title}' is due soon."
-            else:
-                message = f"⏰ Reminder: Task '{title}' is due soon!"
-
-            if due_date:
-                message = f"⏰ URGENT REMINDER: Task '{title}' is due at {due_date}"
+            message = self._build_message(title, priority, due_date)
 
-            self.send_notification(user_id, task_id, title, due_date, message, channel)
+            # The ORM write is blocking, so keep it off the event loop
+            await asyncio.to_thread(self.send_notification, user_id, task_id, title, due_date, message, channel)
 
             # In production, publish an event for the notification sent
             if self.dapr_available:
                 try:
-                    with DaprClient() as client:
-                        notification_event = {
-                            "task_id": task_id,
-                            "user_id": user_id,
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "status": "sent",
-                            "channel": channel
-                        }
-
-                        client.publish_event(
-                            pubsub_name="task-pubsub",
-                            topic_name="notifications",
-                            data={"event_id": f"notification_{task_id}", "type": "notification.sent", "data": notification_event},
-                            data_content_type="application/json"
-                        )
+                    await self._publish_notification_sent(task_id, user_id, channel)
                 except Exception as e:
                     logger.error(f"Failed to publish notification.sent event: {str(e)}")
 
@@ -113,57 +160,222 @@ class ReminderConsumer:
             logger.error(f"Error processing reminder event: {str(e)}")
             return False
 
-    def handle_failed_notification(self, notification_id: int, error_details: str):
-        """Handle failed notification and implement retry logic."""
-        logger.error(f"Notification {notification_id} failed: {error_details}")
+    async def _publish_notifications_sent(self, sent: List[Dict[str, Any]]):
+        """Publish many notification.sent events in one Dapr bulk publish request."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=5.0)
+
+        timestamp = datetime.utcnow().isoformat()
+        entries = [
+            {
+                "entryId": str(index),
+                "event": {
+                    "event_id": f"notification_{item['task_id']}",
+                    "type": "notification.sent",
+                    "data": {**item, "timestamp": timestamp, "status": "sent"}
+                },
+                "contentType": "application/json"
+            }
+            for index, item in enumerate(sent)
+        ]
+        response = await self._http.post(NOTIFICATIONS_BULK_PUBLISH_URL, json=entries)
+        response.raise_for_status()
+
+    async def process_reminder_batch(self, events: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Process many reminder events with one insert transaction and one bulk publish.
+
+        Args:
+            events: Reminder event payloads
+
+        Returns:
+            One success flag per event, in input order
+        """
+        results = [False] * len(events)
+        notifications = []
+        sent = []
+        indexes = []
+
+        for index, event_data in enumerate(events):
+            task_id = event_data.get("task_id")
+            user_id = event_data.get("user_id")
+            due_date = event_data.get("due_date")
+            title = event_data.get("title")
+            channel = event_data.get("channel", "push")
+
+            if not all([task_id, user_id, title]):
+                logger.error("Missing required fields in reminder event data")
+                continue
+
+            try:
+                message = self._build_message(title, event_data.get("priority", "medium"), due_date)
+                notifications.append(self._build_notification(user_id, task_id, title, due_date, message, channel))
+            except Exception as e:
+                logger.error(f"Error processing reminder event: {str(e)}")
+                continue
+            sent.append({"task_id": task_id, "user_id": user_id, "channel": channel})
+            indexes.append(index)
+
+        if not notifications:
+            return results
+
+        try:
+            await asyncio.to_thread(self.save_notifications, notifications)
+        except Exception as e:
+            logger.error(f"Error saving reminder batch: {str(e)}")
+            return results
+
+        for index in indexes:
+            results[index] = True
+
+        if self.dapr_available:
+            try:
+                await self._publish_notifications_sent(sent)
+            except Exception as e:
+                logger.error(f"Failed to bulk publish notification.sent events: {str(e)}")
+
+        return results
+
+    async def submit_event(self, event_data: Dict[str, Any]) -> bool:
+        """
+        Queue a reminder event for batched processing.
+
+        Intended for the Dapr subscription handler: resolves to this event's
+        outcome once the batch it landed in has been processed.
+        """
+        self._ensure_batcher()
 
-        # Update notification record with failure status
+        future = asyncio.get_running_loop().create_future()
+        # Blocks while the queue is full, slowing the subscription down to the writer's pace
+        await self._pending.put((event_data, future))
+        return await future
+
+    def _ensure_batcher(self):
+        """Create the event queue and start the batcher task if it isn't running."""
+        if self._pending is None:
+            self._pending = asyncio.Queue(maxsize=REMINDER_QUEUE_MAXSIZE)
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.create_task(self._run_batcher())
+
+    async def _next_batch(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        """Wait for the first queued event, then collect more until the batch is full or times out."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._pending.get()]
+
+        # Take whatever is already queued without waiting
+        while len(batch) < REMINDER_BATCH_SIZE and not self._pending.empty():
+            batch.append(self._pending.get_nowait())
+
+        deadline = loop.time() + REMINDER_BATCH_WAIT_MS / 1000
+
+        while len(batch) < REMINDER_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run_batcher(self):
+        """Process queued reminder events batch by batch."""
+        while True:
+            batch = await self._next_batch()
+            try:
+                results = await self.process_reminder_batch([event for event, _ in batch])
+            except Exception as e:
+                logger.error(f"Error processing reminder batch: {str(e)}")
+                results = [False] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _record_failures(self, notification_ids: List[int]) -> List[Tuple[int, int]]:
+        """Mark notifications failed and bump their delivery attempts in one UPDATE ... RETURNING."""
+        statement = (
+            update(Notification)
+            .where(Notification.id.in_(notification_ids))
+            .values(delivery_attempts=Notification.delivery_attempts + 1, status="failed")
+            .returning(Notification.id, Notification.delivery_attempts)
+        )
         with Session(self.engine) as session:
-            # Get the notification
-            notification = session.get(Notification, notification_id)
-            if notification:
-                notification.delivery_attempts += 1
-                notification.status = "failed"
-                session.add(notification)
-                session.commit()
-
-                # Check if we should retry
-                if notification.delivery_attempts < 3:  # Retry up to 3 times
-                    logger.info(f"Scheduling retry for notification {notification_id}")
-                    # In a real implementation, you would schedule a retry
-                else:
-                    logger.warning(f"Max retries reached for notification {notification_id}")
-                    # Move to dead letter queue or mark as permanently failed
-                    self.move_to_dead_letter_queue(notification)
+            rows = [tuple(row) for row in session.execute(statement).all()]
+            session.commit()
+        return rows
+
+    async def handle_failed_notifications(self, notification_ids: List[int], error_details: str):
+        """Handle a burst of failed notifications and implement retry logic for all of them at once."""
+        if not notification_ids:
+            return
+
+        logger.error(f"Notifications {notification_ids} failed: {error_details}")
+
+        # Update notification records with failure status
+        rows = await asyncio.to_thread(self._record_failures, notification_ids)
+
+        exhausted = []
+        for notification_id, delivery_attempts in rows:
+            # Check if we should retry
+            if delivery_attempts < 3:  # Retry up to 3 times
+                logger.info(f"Scheduling retry for notification {notification_id}")
+                # In a real implementation, you would schedule a retry
+            else:
+                logger.warning(f"Max retries reached for notification {notification_id}")
+                exhausted.append(notification_id)
+
+        if exhausted:
+            # Move to dead letter queue or mark as permanently failed
+            self.move_to_dead_letter_queue_bulk(exhausted)
+
+    async def handle_failed_notification(self, notification_id: int, error_details: str):
+        """Handle failed notification and implement retry logic."""
+        await self.handle_failed_notifications([notification_id], error_details)
 
     def move_to_dead_letter_queue(self, notification: Notification):
         """Move failed notification to dead letter queue for manual processing."""
-        logger.warning(f"Moving notification {notification.id} to dead letter queue")
-        # In a real implementation, this would move the notification to a separate table
+        self.move_to_dead_letter_queue_bulk([notification.id])
+
+    def move_to_dead_letter_queue_bulk(self, notification_ids: List[int]):
+        """Move failed notifications to dead letter queue for manual processing."""
+        logger.warning(f"Moving notifications {notification_ids} to dead letter queue")
+        # In a real implementation, this would move the notifications to a separate table
         # or queue for manual processing by an admin
         pass
 
     async def start_consumer(self):
         """Start consuming reminder events from Kafka via Dapr."""
+        # Batches are processed whether or not Dapr is available
+        self._ensure_batcher()
+
         if not self.dapr_available:
             logger.info("Dapr not available - running in development mode without Kafka consumption")
             return
 
         logger.info("Starting reminder consumer...")
 
+        attempt = 0
         while True:
             try:
                 # In a real implementation, this would connect to Kafka via Dapr
                 # For now, we'll simulate event consumption
                 with DaprClient() as client:
-                    # Subscribe to reminders topic and listen for reminder events
-                    # This is a simplified version - in reality you'd need to implement
+                    attempt = 0
+                    # Subscribe to reminders topic and listen for reminder events;
+                    # they reach the batcher through submit_event. This is a
+                    # simplified version - in reality you'd need to implement
                     # proper event subscription and processing
-                    pass
+                    while True:
+                        await asyncio.sleep(CONSUMER_IDLE_SECONDS)
 
             except Exception as e:
-                logger.error(f"Error in reminder consumer: {str(e)}")
-                await asyncio.sleep(5)  # Wait before retrying
+                attempt = min(attempt + 1, RETRY_MAX_EXPONENT)
+                # Random delay so replicas don't retry in lockstep
+                delay = random.uniform(0, min(RETRY_CAP_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+                logger.error(f"Error in reminder consumer: {str(e)}; retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
 
     def run_dev_mode(self):
         """Run in development mode without Dapr/Kafka."""
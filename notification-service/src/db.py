@@ -0,0 +1,40 @@
+"""Database engine setup for the notification service."""
+
+import os
+
+from sqlalchemy.engine import Engine, make_url
+from sqlmodel import create_engine
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./notifications.db")
+
+
+def create_db_engine(database_url: str) -> Engine:
+    """
+    Create a pooled engine for the notification database.
+
+    On PostgreSQL, multi-row INSERTs are sent as batched VALUES pages. With
+    psycopg2, executemany UPDATE/DELETE also go through execute_batch, so
+    batch writes cost one round-trip per page instead of one per row.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != "postgresql":
+        return create_engine(database_url)
+
+    options = {}
+    if url.get_driver_name() == "psycopg2":
+        # executemany_mode is a psycopg2-only dialect argument
+        options["executemany_mode"] = "values_plus_batch"
+    return create_engine(
+        database_url,
+        insertmanyvalues_page_size=1000,
+        pool_size=20,
+        max_overflow=40,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        **options
+    )
+
+
+# Process-wide engine shared by every service and consumer, so they draw
+# from one connection pool
+ENGINE = create_db_engine(DATABASE_URL)
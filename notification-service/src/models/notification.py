@@ -1,12 +1,24 @@
 """Notification model for SQLModel."""
+from dataclasses import dataclass, field
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, text
 from datetime import datetime
 from typing import Optional
 
+from ..utils.dates import utc_now
+
 
 class Notification(SQLModel, table=True):
     """Notification entity representing task reminders."""
 
+    # Partial indexes covering only the rows the pending/failed queries read
+    __table_args__ = (
+        Index("ix_notification_pending", "scheduled_time",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        Index("ix_notification_failed", "scheduled_time",
+              postgresql_where=text("status = 'failed'"), sqlite_where=text("status = 'failed'")),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     task_id: int = Field(foreign_key="task.id")
     user_id: str = Field(max_length=100)
@@ -16,5 +28,21 @@ class Notification(SQLModel, table=True):
     delivery_attempts: int = Field(default=0)
     channel: str = Field(max_length=20)  # email, push, sms
     message_content: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
+
+
+@dataclass(slots=True)
+class NotificationRow:
+    """Lightweight in-flight notification record, inserted with Core rather than built as a Notification."""
+
+    task_id: int
+    user_id: str
+    scheduled_time: datetime
+    channel: str
+    message_content: str
+    sent_time: Optional[datetime] = None
+    status: str = "pending"
+    delivery_attempts: int = 0
+    created_at: datetime = field(default_factory=utc_now)
+    updated_at: datetime = field(default_factory=utc_now)
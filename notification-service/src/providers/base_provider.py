@@ -5,11 +5,28 @@ Abstract base class for different notification channels.
 """
 
 import abc
+import functools
+import hashlib
+import re
 from typing import Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Basic phone number validation (allows +, digits, parentheses, hyphens, spaces)
+_PHONE_RE = re.compile(r'^[\+]?[1-9][\d\s\-\(\)]{7,15}$')
+
+_MESSAGE_HASH = functools.partial(hashlib.blake2b, digest_size=8)
+
+
+def _message_id(recipient: str, message: str) -> str:
+    """Stable 64-bit id for a (recipient, message) pair, hashed without concatenating them."""
+    h = _MESSAGE_HASH(recipient.encode())
+    h.update(b"\0")
+    h.update(message.encode())
+    return h.hexdigest()
+
 class NotificationProvider(abc.ABC):
     """Abstract base class for notification providers."""
 
@@ -86,15 +103,13 @@ class EmailProvider(NotificationProvider):
         # Simulate email sending
         return {
             "success": True,
-            "message_id": f"email_{hash(recipient + message)}",
+            "message_id": f"email_{_message_id(recipient, message)}",
             "provider": "email"
         }
 
     def validate_recipient(self, recipient: str) -> bool:
         """Validate email address format."""
-        import re
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, recipient))
+        return _EMAIL_RE.match(recipient) is not None
 
 
 class PushProvider(NotificationProvider):
@@ -119,7 +134,7 @@ class PushProvider(NotificationProvider):
         # Simulate push notification sending
         return {
             "success": True,
-            "message_id": f"push_{hash(recipient + message)}",
+            "message_id": f"push_{_message_id(recipient, message)}",
             "provider": "push"
         }
 
@@ -148,13 +163,10 @@ class SMSProvider(NotificationProvider):
         # Simulate SMS sending
         return {
             "success": True,
-            "message_id": f"sms_{hash(recipient + message)}",
+            "message_id": f"sms_{_message_id(recipient, message)}",
             "provider": "sms"
         }
 
     def validate_recipient(self, recipient: str) -> bool:
         """Validate phone number format."""
-        import re
-        # Basic phone number validation (allows +, digits, parentheses, hyphens, spaces)
-        pattern = r'^[\+]?[1-9][\d\s\-\(\)]{7,15}$'
-        return bool(re.match(pattern, recipient.strip()))
\ No newline at end of file
+        return _PHONE_RE.match(recipient.strip()) is not None
\ No newline at end of file
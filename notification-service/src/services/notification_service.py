@@ -4,32 +4,42 @@ Notification Service.
 Handles sending notifications to users via different channels.
 """
 
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, Any, List
-from sqlmodel import create_engine, Session, select
+from typing import Dict, Any, List, Optional
+from sqlalchemy import insert, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
 
+from ..db import ENGINE
 from ..models.notification import Notification
+from ..providers.base_provider import NotificationProvider
+from ..utils.dates import parse_due, utc_now
 
 logger = logging.getLogger(__name__)
 
+# Maximum provider sends in flight during a batch
+BATCH_SEND_CONCURRENCY = 32
+
 class NotificationService:
     """Service to handle task reminder notifications."""
 
-    def __init__(self, database_url: str):
+    def __init__(self, engine: Engine = ENGINE, providers: Optional[Dict[str, NotificationProvider]] = None):
         """Initialize the notification service."""
-        self.engine = create_engine(database_url)
-
-    def send_notification(self, user_id: str, task_id: int, title: str, due_date: str,
-                         message: str, channel: str = "push") -> Notification:
-        """Send a notification to the user and save to database."""
+        self.engine = engine
+        # Delivery providers keyed by channel (email, push, sms)
+        self.providers = providers or {}
 
+    def _build_notification(self, user_id: str, task_id: int, title: str, due_date: str,
+                            message: str, channel: str = "push") -> Notification:
+        """Build the (unsaved) record of a notification, stamped as sent; delivery is up to the caller."""
         # Create notification record
         notification = Notification(
             task_id=task_id,
             user_id=user_id,
-            scheduled_time=datetime.fromisoformat(due_date.replace('Z', '+00:00')) if due_date else datetime.utcnow(),
-            sent_time=datetime.utcnow(),
+            scheduled_time=parse_due(due_date),
+            sent_time=utc_now(),
             status="sent",
             delivery_attempts=1,
             channel=channel,
@@ -42,28 +52,79 @@ class NotificationService:
         logger.info(f"NOTIFICATION for user {user_id}: Task {task_id} '{title}' is due at {due_date}")
         logger.info(f"Channel: {channel}, Message: {message}")
 
-        # Save to database
+        return notification
+
+    def send_notification(self, user_id: str, task_id: int, title: str, due_date: str,
+                         message: str, channel: str = "push") -> Notification:
+        """Send a notification to the user and save to database."""
+        notification = self._build_notification(user_id, task_id, title, due_date, message, channel)
+
+        # Save to database; RETURNING fills in the id without a follow-up SELECT
         with Session(self.engine) as session:
-            session.add(notification)
+            statement = insert(Notification).values(**notification.model_dump(exclude={"id"})).returning(Notification.id)
+            notification.id = session.execute(statement).scalar_one()
             session.commit()
-            session.refresh(notification)
 
         return notification
 
-    def send_batch_notifications(self, notifications: List[Dict[str, Any]]) -> List[Notification]:
-        """Send multiple notifications at once."""
-        sent_notifications = []
+    async def _deliver(self, notification_data: Dict[str, Any]) -> Notification:
+        """Deliver one notification through its channel's provider and build its record."""
+        user_id = notification_data.get("user_id")
+        task_id = notification_data.get("task_id")
+        title = notification_data.get("title")
+        due_date = notification_data.get("due_date")
+        message = notification_data.get("message", f"Task '{title}' is due soon!")
+        channel = notification_data.get("channel", "push")
+
+        notification = self._build_notification(user_id, task_id, title, due_date, message, channel)
+
+        provider = self.providers.get(channel)
+        if provider is not None:
+            result = await provider.send(notification_data.get("recipient", user_id), message)
+            if not result.get("success"):
+                # The attempt still counts towards the retry limit, but
+                # nothing was sent
+                notification.status = "failed"
+                notification.sent_time = None
 
-        for notification_data in notifications:
-            user_id = notification_data.get("user_id")
-            task_id = notification_data.get("task_id")
-            title = notification_data.get("title")
-            due_date = notification_data.get("due_date")
-            message = notification_data.get("message", f"Task '{title}' is due soon!")
-            channel = notification_data.get("channel", "push")
+        return notification
+
+    def _save_notifications(self, notifications: List[Notification]):
+        """Insert notification records with one multi-row INSERT and one commit."""
+        with Session(self.engine, expire_on_commit=False) as session:
+            session.add_all(notifications)
+            session.commit()
+
+    async def send_batch_notifications(self, notifications: List[Dict[str, Any]]) -> List[Notification]:
+        """
+        Send multiple notifications concurrently, saving all records in one transaction.
 
-            notification = self.send_notification(user_id, task_id, title, due_date, message, channel)
-            sent_notifications.append(notification)
+        Provider sends overlap, with at most BATCH_SEND_CONCURRENCY in flight;
+        a send that raises is logged and left out of the result.
+        """
+        semaphore = asyncio.Semaphore(BATCH_SEND_CONCURRENCY)
+
+        async def send_one(notification_data: Dict[str, Any]) -> Notification:
+            async with semaphore:
+                return await self._deliver(notification_data)
+
+        results = await asyncio.gather(
+            *(send_one(notification_data) for notification_data in notifications),
+            return_exceptions=True
+        )
+
+        sent_notifications = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send notification: {str(result)}")
+                continue
+            if isinstance(result, BaseException):
+                # Cancellation (e.g. shutdown) is not a failed send
+                raise result
+            sent_notifications.append(result)
+
+        if sent_notifications:
+            await asyncio.to_thread(self._save_notifications, sent_notifications)
 
         return sent_notifications
 
@@ -84,24 +145,27 @@ class NotificationService:
     def retry_failed_notifications(self) -> int:
         """Retry sending failed notifications."""
         failed_notifications = self.get_failed_notifications()
-        retry_count = 0
+        retry_ids = []
 
         for notification in failed_notifications:
             if notification.delivery_attempts < 3:  # Max 3 attempts
                 # In a real implementation, this would retry sending the notification
                 logger.info(f"Retrying notification {notification.id}")
-
-                # Update delivery attempt count
-                with Session(self.engine) as session:
-                    notification.delivery_attempts += 1
-                    session.add(notification)
-                    session.commit()
-
-                retry_count += 1
+                retry_ids.append(notification.id)
             else:
                 logger.warning(f"Max attempts reached for notification {notification.id}, moving to dead letter queue")
 
-        return retry_count
+        if retry_ids:
+            # Update delivery attempt counts in one statement and one transaction
+            with Session(self.engine) as session:
+                session.exec(
+                    update(Notification)
+                    .where(Notification.id.in_(retry_ids))
+                    .values(delivery_attempts=Notification.delivery_attempts + 1)
+                )
+                session.commit()
+
+        return len(retry_ids)
 
     def record_delivery_failure(self, notification_id: int, error_details: str) -> Notification:
         """Record a notification delivery failure."""
@@ -0,0 +1,42 @@
+"""
+Date helpers for the Notification Service.
+
+Parses the ISO 8601 timestamps carried by reminder events. Notification
+columns are naive ``timestamp without time zone``, so every datetime handed
+to them is naive UTC.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+# Use the ciso8601 C parser if available, otherwise fall back to the stdlib
+try:
+    import ciso8601
+    CISO8601_AVAILABLE = True
+except ImportError:
+    CISO8601_AVAILABLE = False
+    ciso8601 = None
+
+UTC = timezone.utc
+
+
+def utc_now() -> datetime:
+    """Current time as a naive UTC datetime."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def parse_due(due_date: Optional[str]) -> datetime:
+    """
+    Parse an event's ISO 8601 due date as naive UTC, defaulting to now when it is missing.
+
+    Values with an offset are converted to UTC; values without one are taken as UTC already.
+    """
+    if not due_date:
+        return utc_now()
+    if CISO8601_AVAILABLE:
+        parsed = ciso8601.parse_datetime(due_date)
+    else:
+        parsed = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+    return parsed
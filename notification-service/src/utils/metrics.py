@@ -5,44 +5,130 @@ Provides metrics for reminder sent and processing.
 """
 
 import time
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, List
 from collections import defaultdict
 from datetime import datetime, timedelta
 import threading
 
+# Use prometheus_client's counters/histograms if available, otherwise fall back
+# to the built-in striped counters
+try:
+    from prometheus_client import CollectorRegistry, Counter, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CollectorRegistry = Counter = Histogram = None
+
 class MetricsCollector:
     """Collects and manages metrics for the notification service."""
 
     def __init__(self):
         """Initialize metrics collector."""
-        self.metrics = defaultdict(int)
-        self.timers = defaultdict(float)
+        self.timers = defaultdict(int)  # accumulated nanoseconds
         self.lock = threading.Lock()
 
+        # Prometheus metrics, exposed through self.registry (e.g. generate_latest)
+        self.registry = CollectorRegistry() if PROMETHEUS_AVAILABLE else None
+        self._prom_counters: Dict[str, Any] = {}
+        self._prom_timers: Dict[str, Any] = {}
+
+        # Counters are striped per thread: each thread bumps its own shard
+        # without locking, and shards are summed when metrics are read
+        self._local = threading.local()
+        self._shards: List[defaultdict] = []
+
         # Initialize counters
-        self.metrics["reminders_sent_total"] = 0
-        self.metrics["notifications_delivered_total"] = 0
-        self.metrics["notifications_failed_total"] = 0
-        self.metrics["retry_attempts_total"] = 0
+        self._counter_names = (
+            "reminders_sent_total",
+            "notifications_delivered_total",
+            "notifications_failed_total",
+            "retry_attempts_total",
+        )
+
+    def _shard(self) -> defaultdict:
+        """Counter shard owned by the calling thread."""
+        shard = getattr(self._local, "counters", None)
+        if shard is None:
+            shard = defaultdict(int)
+            self._local.counters = shard
+            with self.lock:
+                self._shards.append(shard)
+        return shard
+
+    def _prom_metric(self, metrics: Dict[str, Any], metric_type, metric_name: str):
+        """Get or register the Prometheus metric backing `metric_name`."""
+        metric = metrics.get(metric_name)
+        if metric is None:
+            with self.lock:
+                metric = metrics.get(metric_name)
+                if metric is None:
+                    metric = metric_type(metric_name, metric_name.replace("_", " "), registry=self.registry)
+                    metrics[metric_name] = metric
+        return metric
+
+    @staticmethod
+    def _prom_sample(metric, suffix: str) -> float:
+        """Read the sample ending in `suffix` from a Prometheus metric."""
+        for family in metric.collect():
+            for sample in family.samples:
+                if sample.name.endswith(suffix):
+                    return sample.value
+        return 0
+
+    @property
+    def metrics(self) -> Dict[str, int]:
+        """Current counter totals across all threads."""
+        totals = dict.fromkeys(self._counter_names, 0)
+        if self.registry is not None:
+            for metric_name, counter in list(self._prom_counters.items()):
+                totals[metric_name] = int(self._prom_sample(counter, "_total"))
+            return totals
+
+        with self.lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for metric_name, value in list(shard.items()):
+                totals[metric_name] = totals.get(metric_name, 0) + value
+        return totals
 
     def increment_counter(self, metric_name: str, value: int = 1):
         """Increment a counter metric."""
-        with self.lock:
-            self.metrics[metric_name] += value
+        if self.registry is not None:
+            self._prom_metric(self._prom_counters, Counter, metric_name).inc(value)
+            return
+        self._shard()[metric_name] += value
 
     def record_timer(self, metric_name: str, duration: float):
-        """Record a timing metric."""
+        """Record a timing metric given in seconds."""
+        self.record_timer_ns(metric_name, int(duration * 1_000_000_000))
+
+    def record_timer_ns(self, metric_name: str, duration_ns: int):
+        """Record a timing metric given in integer nanoseconds."""
+        if self.registry is not None:
+            self._prom_metric(self._prom_timers, Histogram, metric_name).observe(duration_ns / 1_000_000_000)
+            return
         with self.lock:
-            self.timers[metric_name] += duration
+            self.timers[metric_name] += duration_ns
 
     def get_metrics(self) -> Dict[str, Any]:
         """Get current metrics values."""
-        with self.lock:
-            return {
-                "counters": dict(self.metrics),
-                "timers": dict(self.timers),
-                "timestamp": datetime.utcnow().isoformat()
+        counters = self.metrics
+        if self.registry is not None:
+            timers = {
+                metric_name: self._prom_sample(histogram, "_sum")
+                for metric_name, histogram in list(self._prom_timers.items())
             }
+        else:
+            with self.lock:
+                timers = {
+                    metric_name: duration_ns / 1_000_000_000
+                    for metric_name, duration_ns in self.timers.items()
+                }
+        return {
+            "counters": counters,
+            "timers": timers,
+            "timestamp": datetime.utcnow().isoformat()
+        }
 
     def reminder_sent(self):
         """Record that a reminder was sent."""
@@ -64,16 +150,11 @@ class MetricsCollector:
         """Context manager to time an operation."""
         def decorator(func):
             def wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_ns = time.perf_counter_ns()
                 try:
-                    result = func(*args, **kwargs)
-                    duration = time.time() - start_time
-                    self.record_timer(metric_name, duration)
-                    return result
-                except Exception as e:
-                    duration = time.time() - start_time
-                    self.record_timer(metric_name, duration)
-                    raise e
+                    return func(*args, **kwargs)
+                finally:
+                    self.record_timer_ns(metric_name, time.perf_counter_ns() - start_ns)
             return wrapper
         return decorator
 
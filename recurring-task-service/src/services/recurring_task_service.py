@@ -6,14 +6,34 @@ Handles the logic for creating next occurrences of recurring tasks.
 
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import calendar
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import rrule, rrulestr
+from sqlalchemy import insert
 from sqlmodel import create_engine, Session, select
 
 from ..models.task import Task
 
 logger = logging.getLogger(__name__)
 
+# Days to the next weekday, indexed by datetime.weekday() (Monday=0)
+_WEEKDAY_STEP = (1, 1, 1, 1, 3, 2, 1)
+
+# Fixed steps for the simple recurrences; relativedelta clamps monthly
+# recurrences to the last day of shorter months (Jan 31 -> Feb 28)
+_SIMPLE_STEPS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "monthly": relativedelta(months=1),
+}
+
+
+@lru_cache(maxsize=256)
+def _parsed_rule(recurrence_rule: str):
+    """Parse an iCalendar RRULE string once and reuse the result."""
+    return rrulestr(recurrence_rule)
+
 class RecurringTaskService:
     """Service to handle recurring task logic."""
 
@@ -23,67 +43,57 @@ class RecurringTaskService:
 
     def calculate_next_occurrence(self, recurrence: str, recurrence_rule: str, last_completion: datetime) -> Optional[datetime]:
         """Calculate the next occurrence based on recurrence rules."""
-        if not recurrence:
-            return None
+        step = _SIMPLE_STEPS.get(recurrence)
+        if step is not None:
+            return last_completion + step
 
-        # For simplicity, implement basic recurrence patterns
-        # In production, use a library like dateutil.rrule for complex rules
-        if recurrence == "daily":
-            return last_completion + timedelta(days=1)
-        elif recurrence == "weekly":
-            return last_completion + timedelta(weeks=1)
-        elif recurrence == "monthly":
-            # Simple monthly - same day next month
-            next_month = last_completion.month + 1
-            next_year = last_completion.year
-            if next_month > 12:
-                next_month = 1
-                next_year += 1
-
-            # Handle months with different number of days
-            max_day = calendar.monthrange(next_year, next_month)[1]
-            next_day = min(last_completion.day, max_day)
-
-            return last_completion.replace(year=next_year, month=next_month, day=next_day)
-        elif recurrence == "custom" and recurrence_rule:
-            # In a real implementation, parse the recurrence_rule using a library like dateutil.rrule
-            # For now, we'll implement basic custom patterns
+        if recurrence == "custom" and recurrence_rule:
+            # Legacy shorthand rules, then any iCalendar RRULE
             if "every_2_days" in recurrence_rule:
                 return last_completion + timedelta(days=2)
-            elif "every_weekday" in recurrence_rule:
-                # Find next weekday
-                next_date = last_completion + timedelta(days=1)
-                while next_date.weekday() >= 5:  # Saturday=5, Sunday=6
-                    next_date += timedelta(days=1)
-                return next_date
-            else:
+            if "every_weekday" in recurrence_rule:
+                # Next weekday: Friday jumps 3 days, Saturday 2, everything else 1
+                return last_completion + timedelta(days=_WEEKDAY_STEP[last_completion.weekday()])
+            try:
+                rule = _parsed_rule(recurrence_rule)
+                # Multi-line or EXDATE rules parse to an rruleset, which can't
+                # be re-anchored; an aware UNTIL can't be compared with the
+                # naive completion time
+                if not isinstance(rule, rrule):
+                    logger.warning(f"Unsupported custom recurrence rule: {recurrence_rule}")
+                    return None
+                return rule.replace(dtstart=last_completion).after(last_completion)
+            except (ValueError, TypeError):
                 logger.warning(f"Unsupported custom recurrence rule: {recurrence_rule}")
                 return None
-        else:
-            return None
 
-    def create_next_occurrence(self, completed_task: Task) -> Optional[Task]:
-        """Create the next occurrence of a recurring task."""
+        return None
+
+    def build_next_occurrence(self, completed_task: Task, now: Optional[datetime] = None) -> Optional[Task]:
+        """Build (without saving) the next occurrence of a completed recurring task."""
         if not completed_task.recurrence:
             return None
 
+        if now is None:
+            now = datetime.utcnow()
+
         next_occurrence = self.calculate_next_occurrence(
             completed_task.recurrence,
             completed_task.recurrence_rule,
-            datetime.utcnow()
+            now
         )
 
         if not next_occurrence:
             return None
 
         # Create new task with same properties as original
-        new_task = Task(
+        return Task(
             user_id=completed_task.user_id,
             title=completed_task.title,
             description=completed_task.description,
             completed=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+            created_at=now,
+            updated_at=now,
             priority=completed_task.priority,
             due_date=next_occurrence,  # Set due date to the next occurrence
             tags=completed_task.tags,
@@ -92,42 +102,94 @@ class RecurringTaskService:
             next_occurrence=None  # Will be calculated for the next occurrence
         )
 
-        # Save to database
+    def create_next_occurrences(self, completed_tasks: List[Task]) -> List[Task]:
+        """
+        Create the next occurrences of several completed tasks in one transaction.
+
+        All rows go out in a single INSERT ... RETURNING id, so a burst of
+        completions costs one insert and no per-row refresh. An occurrence
+        that already exists for the same user, title, recurrence and day is
+        not created again.
+
+        Args:
+            completed_tasks: Completed tasks; non-recurring ones are skipped
+
+        Returns:
+            The created tasks, with ids populated
+        """
+        now = datetime.utcnow()
+
         with Session(self.engine) as session:
-            session.add(new_task)
+            created = []
+            seen = set()
+            for completed_task in completed_tasks:
+                new_task = self.build_next_occurrence(completed_task, now)
+                if not new_task:
+                    continue
+                # Skip occurrences already in the database or earlier in this batch
+                key = (new_task.user_id, new_task.title, new_task.recurrence, new_task.due_date.date())
+                if key in seen or not self.prevent_duplicate_creation(
+                    new_task.user_id, new_task.title, new_task.recurrence, new_task.due_date, session
+                ):
+                    continue
+                seen.add(key)
+                created.append((completed_task, new_task))
+            if not created:
+                return []
+
+            new_tasks = [new_task for _, new_task in created]
+
+            rows = [new_task.model_dump(exclude={"id"}) for new_task in new_tasks]
+
+            # Save to database
+            result = session.execute(insert(Task).returning(Task.id, sort_by_parameter_order=True), rows)
+            for new_task, task_id in zip(new_tasks, result.scalars()):
+                new_task.id = task_id
             session.commit()
-            session.refresh(new_task)
 
-        logger.info(f"Created next occurrence of task {completed_task.id}: new task {new_task.id}")
-        return new_task
+        for completed_task, new_task in created:
+            logger.info(f"Created next occurrence of task {completed_task.id}: new task {new_task.id}")
+        return new_tasks
 
-    def prevent_duplicate_creation(self, task_id: int, recurrence: str, next_occurrence: datetime) -> bool:
+    def create_next_occurrence(self, completed_task: Task) -> Optional[Task]:
+        """Create the next occurrence of a recurring task."""
+        new_tasks = self.create_next_occurrences([completed_task])
+        return new_tasks[0] if new_tasks else None
+
+    def prevent_duplicate_creation(self, user_id: str, title: str, recurrence: str, next_occurrence: datetime,
+                                   session: Optional[Session] = None) -> bool:
         """
         Prevent duplicate task creation for the same recurrence pattern on the same day.
 
         Args:
-            task_id: Original task ID
+            user_id: Owner of the recurring task
+            title: Task title
             recurrence: Recurrence pattern
             next_occurrence: Expected next occurrence date
+            session: Session to run the lookup in; a new one is opened if omitted
 
         Returns:
             True if no duplicate exists, False if duplicate would be created
         """
-        # Check if a task with the same title and user already exists for the same date
-        with Session(self.engine) as session:
-            from sqlalchemy import func
-            # Look for tasks with the same user_id, title, and approximate due_date (within a day)
-            stmt = select(Task).where(
-                Task.user_id == task_id,
-                func.date(Task.due_date) == func.date(next_occurrence)
-            )
-
-            existing_tasks = session.exec(stmt).all()
-
-            # If there are existing tasks with similar characteristics, prevent duplicate
-            for task in existing_tasks:
-                if task.title == task_id and task.recurrence == recurrence:
-                    logger.info(f"Duplicate prevention: Task with similar characteristics already exists for {next_occurrence}")
-                    return False
-
-        return True
\ No newline at end of file
+        # A half-open range on due_date (rather than date(due_date)) keeps the
+        # lookup on the (user_id, title, due_date) index
+        day_start = next_occurrence.replace(hour=0, minute=0, second=0, microsecond=0)
+        stmt = select(Task.id).where(
+            Task.user_id == user_id,
+            Task.title == title,
+            Task.recurrence == recurrence,
+            Task.due_date >= day_start,
+            Task.due_date < day_start + timedelta(days=1)
+        ).limit(1)
+
+        if session is None:
+            with Session(self.engine) as session:
+                exists = session.exec(stmt).first() is not None
+        else:
+            exists = session.exec(stmt).first() is not None
+
+        if exists:
+            logger.info(f"Duplicate prevention: Task with similar characteristics already exists for {next_occurrence}")
+            return False
+
+        return True
@@ -4,12 +4,161 @@ Logging Utility for Services.
 Provides structured logging with appropriate levels and formats.
 """
 
+import atexit
+import io
 import logging
+import queue
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 from datetime import datetime
 import json
 
+# Use orjson (C extension) for log serialization if available, otherwise the stdlib
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+_LEVEL_NAMES = {
+    level: logging.getLevelName(level)
+    for level in (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+}
+
+
+def _json_default(value):
+    """Serialize datetimes for the stdlib encoder the way orjson does natively."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(log_data: dict) -> str:
+    """Encode a structured log record as a JSON string."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(log_data).decode()
+    return json.dumps(log_data, default=_json_default)
+
+
+# ISO timestamp for the current millisecond, cached as a (tick, text) pair
+_ts_cache = (0, "")
+
+
+def now_iso() -> str:
+    """Current UTC time in ISO 8601, formatted at most once per millisecond."""
+    global _ts_cache
+    tick = time.time_ns() // 1_000_000
+    cached_tick, text = _ts_cache
+    if tick != cached_tick:
+        seconds, millis = divmod(tick, 1000)
+        text = f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{millis:03d}"
+        _ts_cache = (tick, text)
+    return text
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class _PassThroughQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records without running the formatter.
+
+    Structured records arrive already encoded. Anything else the caller still
+    holds a reference to (message args, traceback frames) is resolved here,
+    before the record crosses to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    """StreamHandler that writes into a buffer and leaves flushing to the listener."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _RawJSONHandler(_BufferedStreamHandler):
+    """
+    Writes a record's pre-encoded JSON payload as one line; runs on the listener thread.
+
+    The payload already carries its own timestamp and level, so structured
+    records skip Formatter (getMessage, formatTime) entirely. Other records
+    go through the handler's formatter as usual.
+    """
+
+    def emit(self, record: logging.LogRecord):
+        structured = record.__dict__.get("structured")
+        if structured is None:
+            super().emit(record)
+            return
+        try:
+            write = self.stream.write
+            write(structured)
+            if record.exc_text:
+                write("\n")
+                write(record.exc_text)
+            write(self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _DrainingQueueListener(QueueListener):
+    """QueueListener that flushes its handlers only once the queue is drained."""
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+def _buffered_stdout():
+    """A 64 KiB buffered text stream over stdout's file descriptor (or stdout itself)."""
+    try:
+        return io.open(sys.stdout.fileno(), "w", buffering=65536, encoding="utf-8", closefd=False)
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        return sys.stdout
+
+
+# Every StructuredLogger enqueues to one queue; a single background listener
+# thread formats the records and writes them out in batches
+_LOG_QUEUE: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener():
+    """Start the shared log listener thread once per process."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+
+        console_handler = _RawJSONHandler(_buffered_stdout())
+        console_handler.setLevel(logging.DEBUG)
+        console_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        ))
+
+        _listener = _DrainingQueueListener(_LOG_QUEUE, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
 
 class StructuredLogger:
     """Structured logger for services."""
@@ -24,6 +173,9 @@ class StructuredLogger:
         """
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
+        self._service_name = name
+        # Bound once so a disabled level costs a single cached lookup
+        self._enabled_for = self.logger.isEnabledFor
 
         # Prevent adding handlers multiple times
         if not self.logger.handlers:
@@ -31,73 +183,63 @@ class StructuredLogger:
 
     def _setup_handlers(self):
         """Set up logging handlers."""
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.DEBUG)
-
-        # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        console_handler.setFormatter(formatter)
+        # Records are only enqueued here; formatting and console output
+        # happen on the shared listener thread
+        _start_listener()
+        self.logger.addHandler(_PassThroughQueueHandler(_LOG_QUEUE))
 
-        self.logger.addHandler(console_handler)
-
-    def _log_structured(self, level: int, message: str, **kwargs):
+    def _log_structured(self, level: int, message: str, *, exc_info: bool = False, **kwargs):
         """
-        Log a structured message.
+        Log a structured message. Callers check that the level is enabled.
 
         Args:
             level: Logging level
             message: Log message
+            exc_info: Attach the current exception's traceback
             **kwargs: Additional structured data
         """
-        if self.logger.isEnabledFor(level):
-            # Add timestamp and service info
-            log_data = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "level": logging.getLevelName(level),
-                "message": message,
-                "service": self.logger.name
-            }
-            log_data.update(kwargs)
-
-            # Log as JSON string
-            self.logger.log(level, json.dumps(log_data))
+        # Add timestamp and service info
+        log_data = {
+            "timestamp": now_iso(),
+            "level": _LEVEL_NAMES.get(level) or logging.getLevelName(level),
+            "message": message,
+            "service": self._service_name
+        }
+        log_data.update(kwargs)
+
+        # Encoded on the calling thread so later mutation of kwargs values
+        # cannot change what the listener writes
+        self.logger.log(level, message, exc_info=exc_info, extra={"structured": _dumps(log_data)})
 
     def debug(self, message: str, **kwargs):
         """Log debug message."""
-        self._log_structured(logging.DEBUG, message, **kwargs)
+        if self._enabled_for(logging.DEBUG):
+            self._log_structured(logging.DEBUG, message, **kwargs)
 
     def info(self, message: str, **kwargs):
         """Log info message."""
-        self._log_structured(logging.INFO, message, **kwargs)
+        if self._enabled_for(logging.INFO):
+            self._log_structured(logging.INFO, message, **kwargs)
 
     def warning(self, message: str, **kwargs):
         """Log warning message."""
-        self._log_structured(logging.WARNING, message, **kwargs)
+        if self._enabled_for(logging.WARNING):
+            self._log_structured(logging.WARNING, message, **kwargs)
 
     def error(self, message: str, **kwargs):
         """Log error message."""
-        self._log_structured(logging.ERROR, message, **kwargs)
+        if self._enabled_for(logging.ERROR):
+            self._log_structured(logging.ERROR, message, **kwargs)
 
     def critical(self, message: str, **kwargs):
         """Log critical message."""
-        self._log_structured(logging.CRITICAL, message, **kwargs)
+        if self._enabled_for(logging.CRITICAL):
+            self._log_structured(logging.CRITICAL, message, **kwargs)
 
     def exception(self, message: str, **kwargs):
         """Log exception with traceback."""
-        if self.logger.isEnabledFor(logging.ERROR):
-            log_data = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "level": "ERROR",
-                "message": message,
-                "service": self.logger.name,
-                "exception": True
-            }
-            log_data.update(kwargs)
-
-            self.logger.exception(json.dumps(log_data))
+        if self._enabled_for(logging.ERROR):
+            self._log_structured(logging.ERROR, message, exc_info=True, exception=True, **kwargs)
 
 
 # Create loggers for different services
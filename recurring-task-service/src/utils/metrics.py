@@ -5,70 +5,155 @@ Provides metrics for recurring task creation and processing.
 """
 
 import time
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, List, Tuple
 from collections import defaultdict
 from datetime import datetime, timedelta
 import threading
 
+# Use HdrHistogram to keep timer distributions (percentiles) if available,
+# otherwise only the accumulated totals are reported
+try:
+    from hdrh.histogram import HdrHistogram
+    HDRH_AVAILABLE = True
+except ImportError:
+    HDRH_AVAILABLE = False
+    HdrHistogram = None
+
+CREATED_TOTAL = "recurring_tasks_created_total"
+PROCESSED_TOTAL = "recurring_tasks_processed_total"
+ERRORS_TOTAL = "recurring_tasks_errors_total"
+
+# Timer histograms track 1 microsecond .. 60 seconds at 3 significant digits
+TIMER_HISTOGRAM_MAX_US = 60_000_000
+TIMER_HISTOGRAM_DIGITS = 3
+TIMER_PERCENTILES = (50, 95, 99)
+
+
+def _new_timer_histogram() -> "HdrHistogram":
+    """Create an empty timer histogram (values in microseconds)."""
+    return HdrHistogram(1, TIMER_HISTOGRAM_MAX_US, TIMER_HISTOGRAM_DIGITS)
+
+
 class MetricsCollector:
     """Collects and manages metrics for the recurring task service."""
 
     def __init__(self):
         """Initialize metrics collector."""
-        self.metrics = defaultdict(int)
-        self.timers = defaultdict(float)
         self.lock = threading.Lock()
 
+        # Counters and timers are sharded per thread: each thread updates its
+        # own dicts without locking, and shards are summed when metrics are read
+        self._local = threading.local()
+        self._shards: List[Tuple[defaultdict, defaultdict, Dict[str, Any]]] = []
+
         # Initialize counters
-        self.metrics["recurring_tasks_created_total"] = 0
-        self.metrics["recurring_tasks_processed_total"] = 0
-        self.metrics["recurring_tasks_errors_total"] = 0
+        self._counter_names = (CREATED_TOTAL, PROCESSED_TOTAL, ERRORS_TOTAL)
+
+    def _shard(self) -> Tuple[defaultdict, defaultdict, Dict[str, Any]]:
+        """(counters, timers, timer histograms) shard owned by the calling thread."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = (defaultdict(int), defaultdict(float), {})
+            self._local.shard = shard
+            with self.lock:
+                self._shards.append(shard)
+        return shard
+
+    def _totals(self, index: int, initial: Dict[str, Any]) -> Dict[str, Any]:
+        """Sum one part of every shard (0 = counters, 1 = timers)."""
+        with self.lock:
+            shards = list(self._shards)
+        totals = dict(initial)
+        for shard in shards:
+            for metric_name, value in list(shard[index].items()):
+                totals[metric_name] = totals.get(metric_name, 0) + value
+        return totals
+
+    @property
+    def metrics(self) -> Dict[str, int]:
+        """Current counter totals across all threads."""
+        return self._totals(0, dict.fromkeys(self._counter_names, 0))
+
+    @property
+    def timers(self) -> Dict[str, float]:
+        """Current timer totals across all threads."""
+        return self._totals(1, {})
 
     def increment_counter(self, metric_name: str, value: int = 1):
         """Increment a counter metric."""
-        with self.lock:
-            self.metrics[metric_name] += value
+        self._shard()[0][metric_name] += value
+
+    def get_counter(self, metric_name: str) -> int:
+        """Get the current value of a counter metric."""
+        return self.metrics.get(metric_name, 0)
 
     def record_timer(self, metric_name: str, duration: float):
         """Record a timing metric."""
+        shard = self._shard()
+        shard[1][metric_name] += duration
+
+        if HDRH_AVAILABLE:
+            histogram = shard[2].get(metric_name)
+            if histogram is None:
+                histogram = shard[2][metric_name] = _new_timer_histogram()
+            histogram.record_value(min(max(int(duration * 1_000_000), 1), TIMER_HISTOGRAM_MAX_US))
+
+    def timer_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 (in seconds) per timer, merged across threads."""
+        if not HDRH_AVAILABLE:
+            return {}
+
         with self.lock:
-            self.timers[metric_name] += duration
+            shards = list(self._shards)
+        merged: Dict[str, Any] = {}
+        for shard in shards:
+            for metric_name, histogram in list(shard[2].items()):
+                if metric_name not in merged:
+                    merged[metric_name] = _new_timer_histogram()
+                merged[metric_name].add(histogram)
+
+        return {
+            metric_name: {
+                f"p{percentile}": histogram.get_value_at_percentile(percentile) / 1_000_000
+                for percentile in TIMER_PERCENTILES
+            }
+            for metric_name, histogram in merged.items()
+        }
 
     def get_metrics(self) -> Dict[str, Any]:
         """Get current metrics values."""
-        with self.lock:
-            return {
-                "counters": dict(self.metrics),
-                "timers": dict(self.timers),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+        return {
+            "counters": self.metrics,
+            "timers": self.timers,
+            "timer_percentiles": self.timer_percentiles(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
 
     def recurring_task_created(self):
         """Record that a recurring task was created."""
-        self.increment_counter("recurring_tasks_created_total")
+        self._shard()[0][CREATED_TOTAL] += 1
 
     def recurring_task_processed(self):
         """Record that a recurring task was processed."""
-        self.increment_counter("recurring_tasks_processed_total")
+        self._shard()[0][PROCESSED_TOTAL] += 1
 
     def recurring_task_error(self):
         """Record that an error occurred processing a recurring task."""
-        self.increment_counter("recurring_tasks_errors_total")
+        self._shard()[0][ERRORS_TOTAL] += 1
 
     def time_operation(self, metric_name: str) -> Callable:
         """Context manager to time an operation."""
+        # Bound once so the wrapper body does no attribute lookups
+        perf_counter_ns = time.perf_counter_ns
+        record_timer = self.record_timer
+
         def decorator(func):
             def wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_ns = perf_counter_ns()
                 try:
-                    result = func(*args, **kwargs)
-                    duration = time.time() - start_time
-                    self.record_timer(metric_name, duration)
-                    return result
-                except Exception as e:
-                    duration = time.time() - start_time
-                    self.record_timer(metric_name, duration)
-                    raise e
+                    return func(*args, **kwargs)
+                finally:
+                    record_timer(metric_name, (perf_counter_ns() - start_ns) / 1_000_000_000)
             return wrapper
         return decorator
 
@@ -79,14 +164,14 @@ metrics_collector = MetricsCollector()
 
 def get_recurring_tasks_created():
     """Get the count of recurring tasks created."""
-    return metrics_collector.metrics["recurring_tasks_created_total"]
+    return metrics_collector.get_counter(CREATED_TOTAL)
 
 
 def get_recurring_tasks_processed():
     """Get the count of recurring tasks processed."""
-    return metrics_collector.metrics["recurring_tasks_processed_total"]
+    return metrics_collector.get_counter(PROCESSED_TOTAL)
 
 
 def get_recurring_tasks_errors():
     """Get the count of recurring task errors."""
-    return metrics_collector.metrics["recurring_tasks_errors_total"]
\ No newline at end of file
+    return metrics_collector.get_counter(ERRORS_TOTAL)
\ No newline at end of file
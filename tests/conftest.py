@@ -0,0 +1,36 @@
+"""Shared helpers for tests."""
+
+import importlib
+import importlib.util
+import sys
+from importlib.machinery import ModuleSpec
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def load_service_module(service_dir: str, module: str):
+    """
+    Import a module from one of the standalone services (e.g. notification-service).
+
+    Each service keeps its code in a ``src`` directory without an
+    ``__init__.py``, so the directory is registered under its own package
+    name to keep services with same-named modules apart.
+
+    Args:
+        service_dir: Service directory name, relative to the repository root
+        module: Dotted module path inside the service's ``src`` directory
+
+    Returns:
+        The imported module
+    """
+    package = service_dir.replace("-", "_") + "_src"
+    if package not in sys.modules:
+        spec = ModuleSpec(package, None, is_package=True)
+        package_module = importlib.util.module_from_spec(spec)
+        package_module.__path__ = [str(REPO_ROOT / service_dir / "src")]
+        sys.modules[package] = package_module
+    return importlib.import_module(f"{package}.{module}")
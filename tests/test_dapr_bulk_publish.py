@@ -0,0 +1,72 @@
+"""Tests for DaprEventPublisher.publish_events_bulk."""
+
+import httpx
+
+from app.dapr.client import DaprEventPublisher
+
+
+class StubHTTPClient:
+    """Stands in for the sidecar's bulk publish endpoint."""
+
+    def __init__(self, status_code: int, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.requests = []
+
+    def post(self, url, json):
+        self.requests.append((url, json))
+        return httpx.Response(self.status_code, json=self.body, request=httpx.Request("POST", url))
+
+
+class StubDaprClient:
+    """Records the single-event publishes used to retry failed entries."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish_event(self, pubsub_name, topic_name, data, data_content_type):
+        self.published.append(data)
+
+
+def _publisher(http):
+    publisher = DaprEventPublisher()
+    publisher.dapr_available = True
+    publisher._http = http
+    publisher._client = StubDaprClient()
+    return publisher
+
+
+def _reminders(count):
+    return [{"task_id": task_id, "user_id": "user-1"} for task_id in range(count)]
+
+
+def test_bulk_publish_success_does_not_retry():
+    http = StubHTTPClient(204)
+    publisher = _publisher(http)
+
+    assert publisher.publish_reminders_bulk(_reminders(3)) == [True, True, True]
+
+    url, entries = http.requests[0]
+    assert url.endswith("/publish/bulk/task-pubsub/reminders")
+    assert [entry["entryId"] for entry in entries] == ["0", "1", "2"]
+    assert publisher._client.published == []
+
+
+def test_bulk_publish_retries_only_failed_entries():
+    http = StubHTTPClient(500, {
+        "failedEntries": [{"entryId": "2", "error": "broker unavailable"}],
+        "errorCode": "ERR_PUBSUB_PUBLISH_MESSAGE"
+    })
+    publisher = _publisher(http)
+
+    assert publisher.publish_reminders_bulk(_reminders(4)) == [True, True, True, True]
+
+    assert len(publisher._client.published) == 1
+    assert '"task_id": 2' in publisher._client.published[0]
+
+
+def test_bulk_publish_request_failure_retries_every_entry():
+    publisher = _publisher(StubHTTPClient(404, {"errorCode": "ERR_PUBSUB_NOT_FOUND"}))
+
+    assert publisher.publish_reminders_bulk(_reminders(2)) == [True, True]
+    assert len(publisher._client.published) == 2
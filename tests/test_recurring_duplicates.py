@@ -0,0 +1,78 @@
+"""Tests for duplicate prevention in the recurring task service."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+
+def _make_service():
+    """Recurring task service on an in-memory SQLite database with the task table."""
+    from sqlalchemy import ARRAY
+    from sqlalchemy.ext.compiler import compiles
+    from sqlmodel import SQLModel
+
+    from conftest import load_service_module
+
+    # SQLite has no ARRAY type; the tags column only needs to exist here
+    @compiles(ARRAY, "sqlite")
+    def _compile_array(element, compiler, **kw):
+        return "JSON"
+
+    service_module = load_service_module("recurring-task-service", "services.recurring_task_service")
+    Task = load_service_module("recurring-task-service", "models.task").Task
+
+    service = service_module.RecurringTaskService("sqlite://")
+    SQLModel.metadata.create_all(service.engine, tables=[Task.__table__])
+    return service, Task
+
+
+def _same_day_duplicate_is_skipped():
+    """Complete a daily task twice; only the first completion creates an occurrence."""
+    from sqlalchemy import func, select
+
+    service, Task = _make_service()
+    completed = Task(id=1, user_id="user-1", title="Water plants", completed=True, recurrence="daily")
+
+    first = service.create_next_occurrences([completed])
+    assert len(first) == 1 and first[0].id is not None
+
+    assert service.create_next_occurrences([completed]) == []
+    assert service.create_next_occurrence(completed) is None
+
+    with service.engine.connect() as connection:
+        saved = connection.execute(select(func.count()).select_from(Task.__table__)).scalar_one()
+    assert saved == 1
+
+
+def _same_batch_duplicate_is_skipped():
+    """Two completions of the same task in one batch create a single occurrence."""
+    service, Task = _make_service()
+    completed = Task(id=1, user_id="user-1", title="Water plants", completed=True, recurrence="weekly")
+
+    assert len(service.create_next_occurrences([completed, completed])) == 1
+
+
+def _run_isolated(check_name: str):
+    """
+    Run a check from this module in a fresh interpreter.
+
+    The service's Task model maps the same ``task`` table as
+    ``app.models.task``, so the two cannot be imported into one process.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", f"import {Path(__file__).stem} as t; t.{check_name}()"],
+        cwd=TESTS_DIR,
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_same_day_duplicate_is_skipped():
+    _run_isolated("_same_day_duplicate_is_skipped")
+
+
+def test_same_batch_duplicate_is_skipped():
+    _run_isolated("_same_batch_duplicate_is_skipped")
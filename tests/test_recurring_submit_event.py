@@ -0,0 +1,41 @@
+"""Tests for batched task.completed processing in the app's recurring task service."""
+
+import asyncio
+
+import pytest
+
+from app.services import recurring_task_service
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(recurring_task_service, "DAPR_AVAILABLE", False)
+    return recurring_task_service.RecurringTaskService("sqlite://")
+
+
+def test_submit_event_resolves_without_dapr(service):
+    batches = []
+    service.process_task_completed_batch = lambda events: batches.append(events) or len(events)
+
+    async def run():
+        # start_consumer returns without Dapr, but the batcher must still run
+        await service.start_consumer()
+        return await asyncio.wait_for(asyncio.gather(
+            service.submit_event({"id": 1, "user_id": "user-1"}),
+            service.submit_event({"id": 2, "user_id": "user-1"}),
+        ), timeout=5)
+
+    assert asyncio.run(run()) == [True, True]
+    assert batches == [[{"id": 1, "user_id": "user-1"}, {"id": 2, "user_id": "user-1"}]]
+
+
+def test_submit_event_starts_batcher_lazily(service):
+    def fail(events):
+        raise RuntimeError("database unavailable")
+
+    service.process_task_completed_batch = fail
+
+    async def run():
+        return await asyncio.wait_for(service.submit_event({"id": 1, "user_id": "user-1"}), timeout=5)
+
+    assert asyncio.run(run()) is False
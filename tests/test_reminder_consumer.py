@@ -0,0 +1,63 @@
+"""Tests for the notification service's batched reminder consumer."""
+
+import asyncio
+
+from sqlalchemy import Column, Integer, MetaData, Table, func, select
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine
+
+from conftest import load_service_module
+
+reminder_consumer = load_service_module("notification-service", "consumers.reminder_consumer")
+notification_models = load_service_module("notification-service", "models.notification")
+
+
+def _make_engine():
+    """In-memory SQLite engine with the notification table (and a stub task table for its FK)."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    metadata = MetaData()
+    Table("task", metadata, Column("id", Integer, primary_key=True))
+    notification_models.Notification.__table__.to_metadata(metadata)
+    metadata.create_all(engine)
+    return engine
+
+
+def test_submit_event_futures_resolve_without_dapr():
+    engine = _make_engine()
+    consumer = reminder_consumer.ReminderConsumer(engine=engine)
+    consumer.dapr_available = False
+
+    async def run():
+        # start_consumer returns without Dapr, but the batcher must still run
+        await consumer.start_consumer()
+        return await asyncio.wait_for(asyncio.gather(
+            consumer.submit_event({"task_id": 1, "user_id": "user-1", "title": "Pay rent"}),
+            consumer.submit_event({"task_id": 2, "user_id": "user-1", "title": "Call mom", "priority": "high"}),
+            consumer.submit_event({"task_id": 3, "user_id": "user-1"}),  # missing title
+        ), timeout=5)
+
+    assert asyncio.run(run()) == [True, True, False]
+
+    with engine.connect() as connection:
+        saved = connection.execute(
+            select(func.count()).select_from(notification_models.Notification.__table__)
+        ).scalar_one()
+    assert saved == 2
+
+
+def test_submit_event_starts_batcher_lazily():
+    engine = _make_engine()
+    consumer = reminder_consumer.ReminderConsumer(engine=engine)
+    consumer.dapr_available = False
+
+    async def run():
+        return await asyncio.wait_for(
+            consumer.submit_event({"task_id": 1, "user_id": "user-1", "title": "Pay rent"}),
+            timeout=5
+        )
+
+    assert asyncio.run(run()) is True
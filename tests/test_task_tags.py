@@ -0,0 +1,82 @@
+"""Tests that the SQLite tag filter sees tasks from every write path."""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./todo_app_test.db")
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models.user import User
+from app.models.task import IS_SQLITE, Task
+from app.models.task_tag import TaskTag
+from app.models.outbox import OutboxEvent
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.recurring_task_service import RecurringTaskService
+from app.services.task_service import TaskService
+
+pytestmark = pytest.mark.skipif(not IS_SQLITE, reason="task_tag only backs the SQLite tag filter")
+
+USER_ID = "user-1"
+
+
+@pytest.fixture
+def session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _titles_tagged(session: Session, tag: str):
+    return {task.title for task in TaskService(session).get_by_user_advanced(USER_ID, tag=tag)}
+
+
+def test_create_advanced_core_insert(session):
+    TaskService(session).create_advanced(USER_ID, "Core insert", tags=["work"])
+    assert _titles_tagged(session, "work") == {"Core insert"}
+
+
+def test_create_advanced_tracked(session):
+    TaskService(session).create_advanced(USER_ID, "Tracked insert", tags=["work"], track=True)
+    assert _titles_tagged(session, "work") == {"Tracked insert"}
+
+
+def test_orm_add_like_mcp_add_task(session):
+    session.add(Task(user_id=USER_ID, title="ORM insert", tags=["home"]))
+    session.commit()
+    assert _titles_tagged(session, "home") == {"ORM insert"}
+
+
+def test_update_advanced_retags(session):
+    task = TaskService(session).create_advanced(USER_ID, "Retagged", tags=["work"])
+    TaskService(session).update_advanced(task.id, USER_ID, tags=["home"])
+    assert _titles_tagged(session, "work") == set()
+    assert _titles_tagged(session, "home") == {"Retagged"}
+
+
+def test_orm_update_like_mcp_update_task(session):
+    task = Task(user_id=USER_ID, title="ORM update", tags=["work"])
+    session.add(task)
+    session.commit()
+
+    task.tags = ["errands"]
+    session.add(task)
+    session.commit()
+    assert _titles_tagged(session, "work") == set()
+    assert _titles_tagged(session, "errands") == {"ORM update"}
+
+
+def test_recurring_next_occurrence(session):
+    completed = Task(user_id=USER_ID, title="Water plants", tags=["home"], recurrence="daily", completed=True)
+    service = RecurringTaskService.__new__(RecurringTaskService)
+
+    service.persist_new_tasks(session, [service.build_next_occurrence(completed)])
+    session.commit()
+    assert _titles_tagged(session, "home") == {"Water plants"}
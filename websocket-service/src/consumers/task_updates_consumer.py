@@ -33,6 +33,30 @@ class TaskUpdatesConsumer:
         if not self.dapr_available:
             logger.warning("Dapr not available. Running in development mode without Dapr integration.")
 
+        # Event dispatch tables: handlers keyed by the segment after the last
+        # dot (e.g. "task.created" -> "created"), then by full event type
+        self._suffix_handlers = {
+            "created": websocket_handler.handle_new_task,
+            "updated": websocket_handler.handle_task_update,
+            "completed": websocket_handler.handle_task_completion,
+        }
+        self._exact_handlers = {
+            # Special handling for API-created/updated/completed tasks
+            "task.created.api": websocket_handler.handle_new_task,
+            "task.updated.api": websocket_handler.handle_task_update,
+            "task.completed.api": websocket_handler.handle_task_completion,
+            "task.listed.api": self._handle_tasks_listed,
+        }
+
+    async def _handle_tasks_listed(self, task_data: Dict[str, Any], user_id: str):
+        """Broadcast that tasks were listed (could be used for UI updates)."""
+        message = {
+            "type": "tasks_listed",
+            "data": task_data,
+            "user_id": user_id
+        }
+        await websocket_handler.broadcast_to_user(user_id, message)
+
     async def process_task_event(self, event_data: Dict[str, Any]) -> bool:
         """Process a task event and broadcast to WebSocket clients."""
         try:
@@ -45,31 +69,12 @@ class TaskUpdatesConsumer:
                 return False
 
             # Route to appropriate handler based on event type
-            if event_type.endswith(".created"):
-                await websocket_handler.handle_new_task(task_data, user_id)
-            elif event_type.endswith(".updated"):
-                await websocket_handler.handle_task_update(task_data, user_id)
-            elif event_type.endswith(".completed"):
-                await websocket_handler.handle_task_completion(task_data, user_id)
-            elif event_type == "task.created.api":
-                # Special handling for API-created tasks
-                await websocket_handler.handle_new_task(task_data, user_id)
-            elif event_type == "task.updated.api":
-                # Special handling for API-updated tasks
-                await websocket_handler.handle_task_update(task_data, user_id)
-            elif event_type == "task.completed.api":
-                # Special handling for API-completed tasks
-                await websocket_handler.handle_task_completion(task_data, user_id)
-            elif event_type == "task.listed.api":
-                # Broadcast that tasks were listed (could be used for UI updates)
-                message = {
-                    "type": "tasks_listed",
-                    "data": task_data,
-                    "user_id": user_id
-                }
-                await websocket_handler.broadcast_to_user(user_id, message)
+            _, dot, suffix = event_type.rpartition(".")
+            handler = (dot and self._suffix_handlers.get(suffix)) or self._exact_handlers.get(event_type)
+            if handler is not None:
+                await handler(task_data, user_id)
             else:
-                logger.info(f"Unknown event type: {event_type}, broadcasting as general update")
+                logger.info("Unknown event type: %s, broadcasting as general update", event_type)
                 message = {
                     "type": "task_general_update",
                     "data": task_data,
@@ -78,11 +83,11 @@ class TaskUpdatesConsumer:
                 }
                 await websocket_handler.broadcast_to_user(user_id, message)
 
-            logger.info(f"Processed task event {event_type} for user {user_id}")
+            logger.info("Processed task event %s for user %s", event_type, user_id)
             return True
 
         except Exception as e:
-            logger.error(f"Error processing task event: {str(e)}")
+            logger.error("Error processing task event: %s", e)
             return False
 
     async def start_consumer(self):
@@ -104,7 +109,7 @@ class TaskUpdatesConsumer:
                     pass
 
             except Exception as e:
-                logger.error(f"Error in task updates consumer: {str(e)}")
+                logger.error("Error in task updates consumer: %s", e)
                 await asyncio.sleep(5)  # Wait before retrying
 
     def run_dev_mode(self):
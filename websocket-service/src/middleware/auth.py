@@ -4,10 +4,14 @@ Authentication Middleware.
 Provides JWT-based authentication for WebSocket and HTTP endpoints.
 """
 
+import base64
+import hashlib
+import hmac
+import json
 import jwt
 import logging
-from typing import Optional, Dict, Any
-from datetime import datetime
+import time
+from typing import Optional, Dict, Any, Tuple, Union
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 from jose import JWTError
@@ -20,27 +24,110 @@ SECRET_KEY = "your-secret-key-here"  # This should be loaded from environment
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Keyed HMAC-SHA256 state, copied per token so the key schedule is computed once
+_HS256_MAC = hmac.new(SECRET_KEY.encode(), digestmod=hashlib.sha256)
+
+# Encoded header segment -> whether it is a plain HS256 header we can verify inline
+_HS256_HEADERS: Dict[bytes, bool] = {}
+_HS256_HEADERS_MAX = 64
+
+# Verified token -> (user_id, cache expiry); reconnects and request bursts
+# re-present the same token. Oldest entries are evicted first.
+_token_cache: Dict[Union[str, bytes], Tuple[str, float]] = {}
+TOKEN_CACHE_MAX_SIZE = 10_000
+TOKEN_CACHE_TTL_SECONDS = 60
+
+# Raw ASGI header name (ASGI lowercases names) and accepted scheme prefixes
+_AUTHORIZATION_HEADER = b"authorization"
+_BEARER_PREFIXES = (b"Bearer ", b"bearer ")
+
+# Paths served without authentication
+_PUBLIC_PATHS = frozenset(("/", "/health", "/docs", "/redoc"))
+
+
+def _b64url_decode(segment: bytes) -> bytes:
+    """Decode an unpadded base64url JWT segment."""
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def _is_hs256_header(segment: bytes) -> bool:
+    """Check (and remember) whether a header segment is plain HS256."""
+    known = _HS256_HEADERS.get(segment)
+    if known is None:
+        header = json.loads(_b64url_decode(segment))
+        known = isinstance(header, dict) and header.get("alg") == ALGORITHM and "crit" not in header
+        if len(_HS256_HEADERS) < _HS256_HEADERS_MAX:
+            _HS256_HEADERS[segment] = known
+    return known
+
+
+def _verify_hs256(token: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Verify an HS256 JWT without going through the jwt library.
+
+    Args:
+        token: JWT token, as a string or raw header bytes
+
+    Returns:
+        Decoded payload, or None if the header isn't plain HS256 and the
+        token should be decoded by the jwt library instead
+
+    Raises:
+        JWTError: If the token is malformed, its signature doesn't match,
+            or it is expired or not yet valid
+    """
+    raw = token if isinstance(token, bytes) else token.encode("ascii")
+    parts = raw.split(b".")
+    if len(parts) != 3:
+        raise JWTError("Not enough segments")
+    header, body, signature = parts
+
+    if not _is_hs256_header(header):
+        return None
+
+    mac = _HS256_MAC.copy()
+    mac.update(header + b"." + body)
+    if not hmac.compare_digest(mac.digest(), _b64url_decode(signature)):
+        raise JWTError("Signature verification failed")
+
+    payload = json.loads(_b64url_decode(body))
+    if not isinstance(payload, dict):
+        raise JWTError("Invalid payload")
+
+    now = time.time()
+    exp = payload.get("exp")
+    if exp is not None and exp <= now:
+        raise JWTError("Signature has expired")
+    nbf = payload.get("nbf")
+    if nbf is not None and nbf > now:
+        raise JWTError("The token is not yet valid (nbf)")
+
+    return payload
+
 
 class AuthMiddleware:
     """Authentication middleware for validating JWT tokens."""
 
     @staticmethod
-    def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    def decode_token(token: Union[str, bytes]) -> Optional[Dict[str, Any]]:
         """
         Decode JWT token and return payload.
 
         Args:
-            token: JWT token string
+            token: JWT token string or raw bytes
 
         Returns:
             Decoded token payload or None if invalid
         """
         try:
             # Remove 'Bearer ' prefix if present
-            if token.startswith("Bearer "):
+            if token.startswith("Bearer " if isinstance(token, str) else b"Bearer "):
                 token = token[7:]
 
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = _verify_hs256(token)
+            if payload is None:
+                # Unusual header; let the jwt library handle (and reject) it
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             return payload
 
         except JWTError as e:
@@ -51,25 +138,37 @@ class AuthMiddleware:
             return None
 
     @staticmethod
-    def verify_token(token: str) -> Optional[str]:
+    def verify_token(token: Union[str, bytes]) -> Optional[str]:
         """
         Verify JWT token and return user ID.
 
         Args:
-            token: JWT token string
+            token: JWT token string or raw bytes
 
         Returns:
             User ID string or None if invalid
         """
+        now = time.time()
+        hit = _token_cache.get(token)
+        if hit is not None:
+            if hit[1] > now:
+                return hit[0]
+            _token_cache.pop(token, None)
+
         payload = AuthMiddleware.decode_token(token)
         if payload:
             user_id = payload.get("sub")
             if user_id:
                 # Check if token is expired
                 exp = payload.get("exp")
-                if exp and datetime.utcnow().timestamp() > exp:
+                if exp and now > exp:
                     logger.warning("Token expired")
                     return None
+
+                if len(_token_cache) >= TOKEN_CACHE_MAX_SIZE:
+                    _token_cache.pop(next(iter(_token_cache)), None)
+                expires_at = now + TOKEN_CACHE_TTL_SECONDS
+                _token_cache[token] = (user_id, min(exp, expires_at) if exp else expires_at)
                 return user_id
 
         return None
@@ -85,14 +184,19 @@ class AuthMiddleware:
         Returns:
             User ID string or None if authentication failed
         """
-        # Check for Authorization header
-        auth_header = request.headers.get("Authorization")
+        # Check for Authorization header in the raw ASGI headers; the token
+        # is passed on as bytes without decoding
+        auth_header = None
+        for name, value in request.scope["headers"]:
+            if name == _AUTHORIZATION_HEADER:
+                auth_header = value
+                break
         if not auth_header:
             logger.warning("No Authorization header found")
             return None
 
         # Verify token format
-        if not auth_header.startswith("Bearer "):
+        if not auth_header.startswith(_BEARER_PREFIXES):
             logger.warning("Invalid Authorization header format")
             return None
 
@@ -160,11 +264,12 @@ def add_auth_middleware(app):
     @app.middleware("http")
     async def auth_middleware(request: Request, call_next):
         # Skip authentication for public endpoints
-        if request.url.path in ["/", "/health", "/docs", "/redoc"]:
+        scope = request.scope
+        if scope["path"] in _PUBLIC_PATHS:
             return await call_next(request)
 
         user_id = await AuthMiddleware.authenticate_request(request)
-        if not user_id and request.method != "OPTIONS":
+        if not user_id and scope["method"] != "OPTIONS":
             # Don't require auth for OPTIONS requests (preflight)
             return JSONResponse(
                 status_code=401,
@@ -7,46 +7,92 @@ Handles WebSocket connections and broadcasts task updates to clients.
 import asyncio
 import json
 import logging
-from typing import Dict, Set, Any
-from datetime import datetime
+import os
+import time
+from typing import Dict, List, Set, Any, Tuple
 
 import websockets
 from websockets.exceptions import ConnectionClosed
 
+# Use orjson (C extension) to encode broadcast payloads if available, otherwise the stdlib
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Number of independent connection registries users are partitioned across
+WEBSOCKET_SHARDS = int(os.getenv("WEBSOCKET_SHARDS", "16"))
+
+
+def _encode(message: Dict[str, Any]) -> str:
+    """Encode a message once so the same text payload is shared by every recipient."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(message)
+
+
+# ISO timestamp for the current millisecond, cached as a (tick, text) pair
+_ts_cache = (0, "")
+
+
+def now_iso() -> str:
+    """Current UTC time in ISO 8601, formatted at most once per millisecond."""
+    global _ts_cache
+    tick = time.time_ns() // 1_000_000
+    cached_tick, text = _ts_cache
+    if tick != cached_tick:
+        seconds, millis = divmod(tick, 1000)
+        text = f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{millis:03d}"
+        _ts_cache = (tick, text)
+    return text
+
+
+def _remove_connections(connections: List[websockets.WebSocketServerProtocol], removed: Set[websockets.WebSocketServerProtocol]):
+    """Remove connections from a list in place."""
+    connections[:] = [connection for connection in connections if connection not in removed]
+
 
 class WebSocketHandler:
     """Handler for WebSocket connections and message broadcasting."""
 
+    # Message templates copied per event; "timestamp" is pre-sized so
+    # broadcast_to_user fills it in without growing the dict
+    _TASK_UPDATE_TEMPLATE = {"type": "task_update", "data": None, "user_id": None, "action": "updated", "timestamp": None}
+    _TASK_CREATED_TEMPLATE = {"type": "task_created", "data": None, "user_id": None, "timestamp": None}
+    _TASK_COMPLETED_TEMPLATE = {"type": "task_completed", "data": None, "user_id": None, "timestamp": None}
+
     def __init__(self):
         """Initialize WebSocket handler."""
-        self.active_connections: Set[websockets.WebSocketServerProtocol] = set()
-        self.user_connections: Dict[str, Set[websockets.WebSocketServerProtocol]] = {}
+        # Plain lists: appends are O(1) and broadcasts iterate them linearly;
+        # the O(n) removal only happens on disconnect
+        self.active_connections: List[websockets.WebSocketServerProtocol] = []
+        self.user_connections: Dict[str, List[websockets.WebSocketServerProtocol]] = {}
 
     async def connect(self, websocket: websockets.WebSocketServerProtocol, user_id: str):
         """Connect a new WebSocket client."""
-        await websocket.send(json.dumps({
+        await websocket.send(_encode({
             "type": "connection_established",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now_iso(),
             "message": f"Connected to WebSocket server as user {user_id}"
         }))
 
-        # Add connection to global set
-        self.active_connections.add(websocket)
+        # Add connection to global list
+        self.active_connections.append(websocket)
 
         # Add to user-specific connections
-        if user_id not in self.user_connections:
-            self.user_connections[user_id] = set()
-        self.user_connections[user_id].add(websocket)
+        self.user_connections.setdefault(user_id, []).append(websocket)
 
-        logger.info(f"User {user_id} connected. Total connections: {len(self.active_connections)}")
+        logger.info("User %s connected. Total connections: %d", user_id, len(self.active_connections))
 
         try:
             # Keep connection alive
             await websocket.wait_closed()
         except ConnectionClosed:
-            logger.info(f"Connection with user {user_id} closed")
+            logger.info("Connection with user %s closed", user_id)
         finally:
             # Clean up on disconnect
             await self.disconnect(websocket, user_id)
@@ -54,15 +100,42 @@ class WebSocketHandler:
     async def disconnect(self, websocket: websockets.WebSocketServerProtocol, user_id: str):
         """Disconnect a WebSocket client."""
         # Remove from global connections
-        self.active_connections.discard(websocket)
+        _remove_connections(self.active_connections, {websocket})
 
         # Remove from user-specific connections
         if user_id in self.user_connections:
-            self.user_connections[user_id].discard(websocket)
+            _remove_connections(self.user_connections[user_id], {websocket})
             if not self.user_connections[user_id]:  # If no connections left for user
                 del self.user_connections[user_id]
 
-        logger.info(f"User {user_id} disconnected. Remaining connections: {len(self.active_connections)}")
+        logger.info("User %s disconnected. Remaining connections: %d", user_id, len(self.active_connections))
+
+    async def _send_all(self, connections: Tuple[websockets.WebSocketServerProtocol, ...], payload) -> Set[websockets.WebSocketServerProtocol]:
+        """
+        Send a payload to every connection concurrently.
+
+        Args:
+            connections: Snapshot of the connections to send to
+            payload: Encoded message
+
+        Returns:
+            The connections whose send failed
+        """
+        results = await asyncio.gather(
+            *(connection.send(payload) for connection in connections),
+            return_exceptions=True
+        )
+
+        disconnected_clients = set()
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                if not isinstance(result, ConnectionClosed):
+                    logger.error("Error sending message to client: %s", result)
+                disconnected_clients.add(connection)
+            elif isinstance(result, BaseException):
+                # Cancellation (e.g. shutdown) is not a failed send
+                raise result
+        return disconnected_clients
 
     async def broadcast_to_all(self, message: Dict[str, Any]):
         """Broadcast message to all connected clients."""
@@ -70,29 +143,26 @@ class WebSocketHandler:
             return
 
         # Add timestamp to message
-        message["timestamp"] = datetime.utcnow().isoformat()
+        message["timestamp"] = now_iso()
 
-        # Convert message to JSON string
-        json_message = json.dumps(message)
+        # Encode once; every recipient is sent the same string
+        await self.broadcast_encoded(_encode(message))
 
-        # Track disconnected clients
-        disconnected_clients = set()
+    async def broadcast_encoded(self, json_message: str):
+        """Send an already encoded message to all connected clients."""
+        if not self.active_connections:
+            return
 
-        for connection in self.active_connections:
-            try:
-                await connection.send(json_message)
-            except ConnectionClosed:
-                disconnected_clients.add(connection)
-            except Exception as e:
-                logger.error(f"Error sending message to client: {e}")
-                disconnected_clients.add(connection)
+        # Send to a frozen snapshot so connects/disconnects during the
+        # sends don't mutate the list being iterated
+        disconnected_clients = await self._send_all(tuple(self.active_connections), json_message)
 
         # Remove disconnected clients
-        for client in disconnected_clients:
-            self.active_connections.discard(client)
+        if disconnected_clients:
+            _remove_connections(self.active_connections, disconnected_clients)
 
         if disconnected_clients:
-            logger.info(f"Removed {len(disconnected_clients)} disconnected clients")
+            logger.info("Removed %d disconnected clients", len(disconnected_clients))
 
     async def broadcast_to_user(self, user_id: str, message: Dict[str, Any]):
         """Broadcast message to all connections for a specific user."""
@@ -100,75 +170,62 @@ class WebSocketHandler:
             return
 
         # Add timestamp to message
-        message["timestamp"] = datetime.utcnow().isoformat()
+        message["timestamp"] = now_iso()
 
-        # Convert message to JSON string
-        json_message = json.dumps(message)
+        # Encode once; every recipient is sent the same string
+        json_message = _encode(message)
 
-        # Track disconnected clients
-        disconnected_clients = set()
-
-        for connection in self.user_connections[user_id]:
-            try:
-                await connection.send(json_message)
-            except ConnectionClosed:
-                disconnected_clients.add(connection)
-            except Exception as e:
-                logger.error(f"Error sending message to user {user_id}: {e}")
-                disconnected_clients.add(connection)
+        # Send to a frozen snapshot so connects/disconnects during the
+        # sends don't mutate the list being iterated
+        disconnected_clients = await self._send_all(tuple(self.user_connections[user_id]), json_message)
 
         # Remove disconnected clients
-        for client in disconnected_clients:
-            self.user_connections[user_id].discard(client)
-            self.active_connections.discard(client)
+        if disconnected_clients:
+            _remove_connections(self.active_connections, disconnected_clients)
+            if user_id in self.user_connections:
+                _remove_connections(self.user_connections[user_id], disconnected_clients)
 
-            # Clean up user entry if no connections left
-            if not self.user_connections[user_id]:
-                del self.user_connections[user_id]
+                # Clean up user entry if no connections left
+                if not self.user_connections[user_id]:
+                    del self.user_connections[user_id]
 
         if disconnected_clients:
-            logger.info(f"Removed {disconnected_clients} disconnected clients for user {user_id}")
+            logger.info("Removed %d disconnected clients for user %s", len(disconnected_clients), user_id)
 
     async def handle_task_update(self, task_data: Dict[str, Any], user_id: str):
         """Handle task update notification."""
-        message = {
-            "type": "task_update",
-            "data": task_data,
-            "user_id": user_id,
-            "action": task_data.get("action", "updated")
-        }
+        message = self._TASK_UPDATE_TEMPLATE.copy()
+        message["data"] = task_data
+        message["user_id"] = user_id
+        message["action"] = task_data.get("action", "updated")
 
         await self.broadcast_to_user(user_id, message)
-        logger.info(f"Task update broadcast to user {user_id}: {task_data.get('task_id')}")
+        logger.info("Task update broadcast to user %s: %s", user_id, task_data.get("task_id"))
 
     async def handle_new_task(self, task_data: Dict[str, Any], user_id: str):
         """Handle new task creation notification."""
-        message = {
-            "type": "task_created",
-            "data": task_data,
-            "user_id": user_id
-        }
+        message = self._TASK_CREATED_TEMPLATE.copy()
+        message["data"] = task_data
+        message["user_id"] = user_id
 
         await self.broadcast_to_user(user_id, message)
-        logger.info(f"New task notification broadcast to user {user_id}: {task_data.get('id')}")
+        logger.info("New task notification broadcast to user %s: %s", user_id, task_data.get("id"))
 
     async def handle_task_completion(self, task_data: Dict[str, Any], user_id: str):
         """Handle task completion notification."""
-        message = {
-            "type": "task_completed",
-            "data": task_data,
-            "user_id": user_id
-        }
+        message = self._TASK_COMPLETED_TEMPLATE.copy()
+        message["data"] = task_data
+        message["user_id"] = user_id
 
         await self.broadcast_to_user(user_id, message)
-        logger.info(f"Task completion notification broadcast to user {user_id}: {task_data.get('id')}")
+        logger.info("Task completion notification broadcast to user %s: %s", user_id, task_data.get("id"))
 
     async def handle_system_message(self, message: str, user_id: str = None):
         """Handle system message broadcast."""
         msg_data = {
             "type": "system_message",
             "message": message,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now_iso()
         }
 
         if user_id:
@@ -178,8 +235,73 @@ class WebSocketHandler:
             # Send to all users
             await self.broadcast_to_all(msg_data)
 
-        logger.info(f"System message sent: {message}")
+        logger.info("System message sent: %s", message)
+
+
+class ShardedWebSocketHandler:
+    """WebSocketHandler partitioned by user ID into independent shards."""
+
+    def __init__(self, shards: int = WEBSOCKET_SHARDS):
+        """
+        Initialize the sharded handler.
+
+        Args:
+            shards: Number of WebSocketHandler shards
+        """
+        self.shards: Tuple[WebSocketHandler, ...] = tuple(WebSocketHandler() for _ in range(max(1, shards)))
+
+    def shard(self, user_id: str) -> WebSocketHandler:
+        """Get the shard holding a user's connections."""
+        return self.shards[hash(user_id) % len(self.shards)]
+
+    async def connect(self, websocket: websockets.WebSocketServerProtocol, user_id: str):
+        """Connect a new WebSocket client."""
+        await self.shard(user_id).connect(websocket, user_id)
+
+    async def disconnect(self, websocket: websockets.WebSocketServerProtocol, user_id: str):
+        """Disconnect a WebSocket client."""
+        await self.shard(user_id).disconnect(websocket, user_id)
+
+    async def broadcast_to_all(self, message: Dict[str, Any]):
+        """Broadcast message to all connected clients across every shard."""
+        # Add timestamp to message
+        message["timestamp"] = now_iso()
+
+        # Encode once for all shards
+        json_message = _encode(message)
+        await asyncio.gather(*(shard.broadcast_encoded(json_message) for shard in self.shards))
+
+    async def broadcast_to_user(self, user_id: str, message: Dict[str, Any]):
+        """Broadcast message to all connections for a specific user."""
+        await self.shard(user_id).broadcast_to_user(user_id, message)
+
+    async def handle_task_update(self, task_data: Dict[str, Any], user_id: str):
+        """Handle task update notification."""
+        await self.shard(user_id).handle_task_update(task_data, user_id)
+
+    async def handle_new_task(self, task_data: Dict[str, Any], user_id: str):
+        """Handle new task creation notification."""
+        await self.shard(user_id).handle_new_task(task_data, user_id)
+
+    async def handle_task_completion(self, task_data: Dict[str, Any], user_id: str):
+        """Handle task completion notification."""
+        await self.shard(user_id).handle_task_completion(task_data, user_id)
+
+    async def handle_system_message(self, message: str, user_id: str = None):
+        """Handle system message broadcast."""
+        if user_id:
+            # Send to specific user
+            await self.shard(user_id).handle_system_message(message, user_id)
+            return
+
+        # Send to all users
+        await self.broadcast_to_all({
+            "type": "system_message",
+            "message": message,
+            "timestamp": now_iso()
+        })
+        logger.info("System message sent: %s", message)
 
 
 # Global WebSocket handler instance
-websocket_handler = WebSocketHandler()
\ No newline at end of file
+websocket_handler = ShardedWebSocketHandler()
\ No newline at end of file